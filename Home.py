@@ -4,11 +4,12 @@ import streamlit as st
 from yaml import SafeLoader
 import streamlit_authenticator as stauth
 
-from pages.helper import db_queries
-from pages.helper.utils import image_obj_to_numpy, extract_face_mesh_landmarks
+from pages.helper import db_queries, upload_cache
+from pages.helper.embedding_codec import encode_embedding, encode_landmarks
+from pages.helper.face_recognition_model import extract_embedding
+from pages.helper.utils import extract_face_mesh_landmarks
+from pages.helper.streamlit_helpers import process_upload_once, upload_saved, mark_upload_saved
 from pages.helper.data_models import PublicSubmissions
-import uuid
-import json
 import os
 
 
@@ -28,6 +29,14 @@ def add_bg_from_local(image_file):
     )
 
 
+@st.cache_resource
+def prepare_database():
+    """Create missing tables, columns and indexes once per server process."""
+    db_queries.create_db()
+
+
+prepare_database()
+
 if "login_status" not in st.session_state:
     st.session_state["login_status"] = False
 
@@ -72,46 +81,58 @@ if st.session_state.get("authentication_status"):
         )
         st.write("---")
 
-        found_cases = db_queries.get_registered_cases_count(user_info["name"], "F")
-        non_found_cases = db_queries.get_registered_cases_count(user_info["name"], "NF")
+        # One indexed GROUP BY instead of loading every case row
+        case_counts = db_queries.registered_case_counts(user_info["name"])
 
         found_col, not_found_col = st.columns(2)
-        found_col.metric("Found Cases Count", value=len(found_cases))
-        not_found_col.metric("Not Found Cases Count", value=len(non_found_cases))
+        found_col.metric("Found Cases Count", value=case_counts.get("F", 0))
+        not_found_col.metric("Not Found Cases Count", value=case_counts.get("NF", 0))
 
     elif page == "Submit Sighting":
         st.title("Report a Spotted Person")
 
         image_obj = st.file_uploader("Upload Spotted Person Image", type=["jpg", "jpeg", "png"])
+        # Runs once per uploaded file, not on every rerun while the form is filled in
+        case_id, processed = process_upload_once(
+            "sighting_upload",
+            image_obj,
+            lambda image: (extract_embedding(image), extract_face_mesh_landmarks(image)),
+        )
         if image_obj:
-            image_numpy = image_obj_to_numpy(image_obj)
-            st.image(image_obj)
-            face_mesh = extract_face_mesh_landmarks(image_numpy)
+            st.image(processed["image"])
+            face_mesh = processed["face_mesh"]
+            for duplicate_id, kind in processed["duplicates"]:
+                st.warning(f"⚠️ This photo looks like an existing {kind} case: {duplicate_id}")
 
-            if face_mesh:
+            if face_mesh is not None:
                 location = st.text_input("Location (Where person was seen)")
                 mobile = st.text_input("Your Mobile Number")
                 email = st.text_input("Your Email (optional)")
                 birth_marks = st.text_input("Birth Marks or Identifiable Marks")
+                approx_age = st.number_input("Approximate Age (0 if unsure)", min_value=0, max_value=100, value=0, step=1)
                 status = "NF"
 
-                if st.button("Submit"):
-                    case_id = str(uuid.uuid4())
-                    image_path = f"./resources/{case_id}.jpg"
-                    with open(image_path, "wb") as f:
-                        f.write(image_obj.read())
+                submit = st.button("Submit")
+                if submit and upload_saved("sighting_upload"):
+                    st.info("This sighting has already been submitted.")
 
+                elif submit:
+                    embedding = processed["embedding"]
                     new_case = PublicSubmissions(
                         id=case_id,
                         submitted_by=user_info["name"],
-                        face_mesh=json.dumps(face_mesh),
+                        face_mesh=encode_landmarks(face_mesh),
+                        embedding=encode_embedding(embedding) if embedding is not None else None,
                         location=location,
                         mobile=mobile,
                         email=email,
                         status=status,
                         birth_marks=birth_marks,
+                        approx_age=approx_age or None,
                     )
                     db_queries.new_public_case(new_case)
+                    upload_cache.record_case(processed["content_hash"], case_id)
+                    mark_upload_saved("sighting_upload")
                     st.success("Sighting submitted successfully!")
 
 elif st.session_state.get("authentication_status") == False:
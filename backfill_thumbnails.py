@@ -0,0 +1,29 @@
+"""
+Generate listing thumbnails for photos already in ./resources.
+
+New uploads get their thumbnail at save time (pages.helper.image_store); run
+this once after upgrading, or with --force after changing THUMB_SIDE/quality.
+
+    python backfill_thumbnails.py [--force]
+"""
+import time
+import argparse
+
+from pages.helper import image_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill thumbnails for existing case photos")
+    parser.add_argument("--force", action="store_true", help="Regenerate thumbnails that already exist")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = image_store.backfill(force=args.force)
+    print(
+        f"✅ {result['created']} thumbnails written, {result['failed']} failed "
+        f"in {time.perf_counter() - start:.2f}s ({image_store.THUMB_FORMAT}, {image_store.THUMB_SIDE}px)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark the matching and embedding pipeline on synthetic data.
+
+Builds a throwaway SQLite database per size with random L2-normalised 512-d
+embeddings (a few sightings are planted near-duplicates of registered cases),
+then times each stage of a match run. Runs offline on CPU: the InsightFace
+model is replaced by a stub, so no model weights are needed.
+
+    python benchmark.py --sizes 1000 10000 100000 --public 1000 --out bench.json
+    python benchmark.py --sizes 1000 --format csv --out bench.csv
+
+Every result row carries the git commit so runs can be compared across commits.
+"""
+import os
+import csv
+import json
+import time
+import uuid
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+from pages.helper import db_queries, match_algo, model_cache, embedding_snapshot
+from pages.helper.database import get_engine, sqlite_url
+from pages.helper.embedding_codec import encode_embedding, decode_embedding
+
+DIM = 512
+THRESHOLD = 0.35
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+INSERT_CHUNK = 10_000
+JSON_DECODE_SAMPLE = 20_000
+
+
+# -------------------- Synthetic Data --------------------
+def random_embeddings(rng, n):
+    matrix = rng.standard_normal((n, DIM), dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def build_database(n_registered, n_public, rng):
+    """Fill the current db_queries engine with synthetic NF cases and sightings."""
+    db_queries.create_db()
+
+    planted = min(n_public // 10, n_registered)
+    registered_sample = None
+    for start in range(0, n_registered, INSERT_CHUNK):
+        count = min(INSERT_CHUNK, n_registered - start)
+        matrix = random_embeddings(rng, count)
+        if registered_sample is None:
+            registered_sample = matrix[:planted].copy()
+        with db_queries.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO registeredcases (id, submitted_by, name, fathers_name, age, "
+                "complainant_mobile, complainant_name, embedding, status, matched_with) "
+                "VALUES (?, 'bench', 'name', 'father', 30, '000', 'complainant', ?, 'NF', '')",
+                [(str(uuid.uuid4()), encode_embedding(v)) for v in matrix],
+            )
+
+    public = random_embeddings(rng, n_public)
+    # Noisy copies of real cases so thresholding and result writing have work to do
+    public[:planted] = registered_sample + 0.03 * rng.standard_normal((planted, DIM), dtype=np.float32)
+    now = datetime.now().isoformat(sep=" ")
+    with db_queries.engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO publicsubmissions (id, submitted_by, embedding, status, submitted_on) "
+            "VALUES (?, 'bench', ?, 'NF', ?)",
+            [(str(uuid.uuid4()), encode_embedding(v), now) for v in public],
+        )
+
+
+class StubFaceAnalysis:
+    """Stands in for insightface FaceAnalysis: one face with a random embedding per image."""
+
+    class Face:
+        def __init__(self, embedding):
+            self.embedding = embedding
+            self.bbox = np.array([0, 0, 112, 112], dtype=np.float32)
+            self.det_score = 0.99
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+
+    def get(self, image):
+        return [self.Face(self.rng.standard_normal(DIM).astype(np.float32))]
+
+
+# -------------------- Stages --------------------
+def timed(results, stage, func, *args, **kwargs):
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    results[stage] = round(time.perf_counter() - start, 4)
+    return value
+
+
+def run_size(n_registered, n_public, seed, processes=0):
+    rng = np.random.default_rng(seed)
+    stages = {}
+    workdir = tempfile.mkdtemp(prefix=f"bench_{n_registered}_")
+    cwd = os.getcwd()
+    app_engine = db_queries.engine
+    # Index, snapshot and match-state files use CWD-relative paths; the engine is swapped explicitly
+    os.chdir(workdir)
+    db_queries.engine = get_engine(sqlite_url(os.path.join(workdir, "sqlite_database.db")))
+    try:
+        timed(stages, "build_db", build_database, n_registered, n_public, rng)
+        stages["db_bytes"] = os.path.getsize("sqlite_database.db")
+
+        reg_rows = timed(stages, "db_fetch_registered", db_queries.fetch_registered_cases, train_data=True)
+        pub_rows = timed(stages, "db_fetch_public", db_queries.fetch_public_cases, train_data=True)
+
+        reg_vectors = timed(stages, "decode_blob", lambda: [decode_embedding(r[1]) for r in reg_rows])
+        json_sample = [json.dumps(v.tolist()) for v in reg_vectors[:JSON_DECODE_SAMPLE]]
+        timed(stages, "decode_json_sample", lambda: [decode_embedding(s) for s in json_sample])
+        stages["decode_json_sample_rows"] = len(json_sample)
+        pub_vectors = [decode_embedding(r[1]) for r in pub_rows]
+
+        reg_matrix = timed(stages, "stack", match_algo.stack_embeddings, reg_vectors)
+        pub_matrix = match_algo.stack_embeddings(pub_vectors)
+        best_index, best_sim = timed(stages, "similarity", match_algo.best_matches, pub_matrix, reg_matrix)
+
+        def threshold():
+            hits = np.flatnonzero(best_sim >= THRESHOLD)
+            return {(reg_rows[best_index[i]][0], pub_rows[i][0]): float(best_sim[i]) for i in hits}
+
+        scores = timed(stages, "threshold", threshold)
+        stages["matches"] = len(scores)
+        timed(stages, "result_write", db_queries.replace_matches, scores)
+
+        timed(stages, "snapshot_export", lambda: [embedding_snapshot.export(kind) for kind in embedding_snapshot.KINDS])
+        timed(stages, "snapshot_load", match_algo.load_snapshots)
+        timed(stages, "match_end_to_end", match_algo.match, threshold=THRESHOLD, verbose=False)
+        if processes > 1:
+            timed(stages, "match_sharded", match_algo.match, threshold=THRESHOLD, processes=processes)
+    finally:
+        db_queries.engine.dispose()
+        db_queries.engine = app_engine
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return stages
+
+
+def run_embedder(n_images, seed):
+    """Time extract_embedding with the stub model (conversion + normalisation overhead)."""
+    from pages.helper.face_recognition_model import extract_embedding
+
+    model_cache.get_model(model_cache.face_analysis_key(), lambda: StubFaceAnalysis(seed))
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(n_images):
+        extract_embedding(image)
+    return {"embed_images": n_images, "embed_seconds": round(time.perf_counter() - start, 4)}
+
+
+# -------------------- Output --------------------
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(rows, path, fmt):
+    if fmt == "json":
+        text = json.dumps(rows, indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+        print(text)
+        return
+    fields = sorted({key for row in rows for key in row})
+    with open(path or "bench_output.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ Wrote {len(rows)} rows to {path or 'bench_output.csv'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matching on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES[:2],
+                        help=f"Registered-case counts to test (e.g. {DEFAULT_SIZES})")
+    parser.add_argument("--public", type=int, default=1000, help="Number of sightings per run")
+    parser.add_argument("--embed-images", type=int, default=200, help="Images through the stub embedder (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=0, help="Also time sharded matching with this many processes")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--out", default=None, help="Output file (JSON is also printed)")
+    args = parser.parse_args()
+
+    env = environment()
+    rows = []
+    for size in args.sizes:
+        print(f"[BENCH] {size} registered × {args.public} sightings ...")
+        rows.append({**env, "registered": size, "public": args.public, **run_size(size, args.public, args.seed, args.processes)})
+    if args.embed_images:
+        rows.append({**env, "registered": 0, "public": 0, **run_embedder(args.embed_images, args.seed)})
+    write_results(rows, args.out, args.format)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Bulk-register cases or sightings from a folder of photos plus a metadata file.
+
+    python bulk_ingest.py registered --images ./partner_photos --metadata cases.csv --submitted-by "Officer A"
+    python bulk_ingest.py public --images ./sightings --metadata sightings.jsonl
+    python bulk_ingest.py public --images ./cctv_stills --metadata stills.csv --all-faces
+
+The metadata file (CSV or JSONL) has one row per photo with an `image` column
+holding the file name (relative to --images) and the model fields for the row,
+e.g. name, fathers_name, age, complainant_mobile, complainant_name for
+registered cases or location, mobile, birth_marks for sightings.
+
+Faces are detected and embedded in batches across each chunk. A registered
+case takes the best face of its photo; with --all-faces every face in a
+sighting photo (group photos, CCTV stills) becomes its own sighting, stored
+with a crop of that face.
+
+Case IDs are derived from the image path, so re-running the same batch skips
+rows that were already inserted (resumable after a crash or Ctrl-C).
+"""
+import os
+import csv
+import json
+import time
+import uuid
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import PIL.Image
+import PIL.ImageOps
+
+from pages.helper import db_queries, image_store, model_cache
+from pages.helper.data_models import RegisteredCases, PublicSubmissions
+from pages.helper.embedding_codec import encode_embedding, encode_landmarks
+from pages.helper.face_recognition_model import extract_faces, extract_landmarks, crop_face
+
+ID_NAMESPACE = uuid.UUID("5b0a8a52-2f8e-4c5e-9a53-1f6f3b7a0c11")
+
+MODELS = {"registered": RegisteredCases, "public": PublicSubmissions}
+REGISTERED_INT_FIELDS = {"age"}
+
+
+def load_metadata(path):
+    if path.endswith(".jsonl"):
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def case_id_for(kind, image_name):
+    """Stable ID per (kind, image) so a resumed run recognises finished rows."""
+    return str(uuid.uuid5(ID_NAMESPACE, f"{kind}/{image_name}"))
+
+
+def decode_image(path):
+    """Runs in a worker process: file → RGB numpy array (None if unreadable)."""
+    try:
+        with PIL.Image.open(path) as image:
+            return np.array(PIL.ImageOps.exif_transpose(image).convert("RGB"))
+    except Exception as e:
+        print(f"[WARN] Could not decode {path}: {e}")
+        return None
+
+
+class StageTimer:
+    """Accumulates items and wall time per pipeline stage."""
+
+    def __init__(self):
+        self.stats = {}
+
+    def add(self, stage, items, seconds):
+        count, total = self.stats.get(stage, (0, 0.0))
+        self.stats[stage] = (count + items, total + seconds)
+
+    def report(self):
+        for stage, (count, seconds) in self.stats.items():
+            rate = count / seconds if seconds else float("inf")
+            print(f"  {stage:<8} {count:>7} items  {seconds:8.2f}s  {rate:8.1f} items/s")
+
+
+def build_row(kind, case_id, meta, embedding, landmarks, submitted_by):
+    fields = {k: v for k, v in meta.items() if k != "image" and k in MODELS[kind].model_fields and v != ""}
+    if kind == "registered":
+        for field in REGISTERED_INT_FIELDS & fields.keys():
+            fields[field] = int(fields[field])
+        fields.setdefault("submitted_by", submitted_by)
+        fields.setdefault("matched_with", "")
+    else:
+        fields.setdefault("submitted_by", submitted_by or "public_user")
+    fields["status"] = "NF"
+    return MODELS[kind](
+        id=case_id, embedding=encode_embedding(embedding), face_mesh=encode_landmarks(landmarks), **fields
+    )
+
+
+def ingest(kind, images_dir, metadata_path, submitted_by, chunk_size, workers, face_mesh=False, all_faces=False):
+    db_queries.create_db()
+    timer = StageTimer()
+    rows = load_metadata(metadata_path)
+    for meta in rows:
+        meta["_id"] = case_id_for(kind, meta["image"])
+
+    done = db_queries.existing_case_ids(MODELS[kind], [m["_id"] for m in rows])
+    pending = [m for m in rows if m["_id"] not in done]
+    print(f"{len(rows)} rows in metadata, {len(done)} already ingested, {len(pending)} to go")
+
+    inserted, skipped = 0, 0
+    insert = db_queries.bulk_register_cases if kind == "registered" else db_queries.bulk_new_public_cases
+    mesh_threads = ThreadPoolExecutor(max_workers=model_cache.FACE_MESH_POOL_SIZE)
+    with ProcessPoolExecutor(max_workers=workers) as pool, mesh_threads:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            paths = [os.path.join(images_dir, m["image"]) for m in chunk]
+
+            t0 = time.perf_counter()
+            images = list(pool.map(decode_image, paths))
+            timer.add("decode", len(chunk), time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            decoded = [i for i, img in enumerate(images) if img is not None]
+            faces_per_image = [[] for _ in chunk]
+            for i, faces in zip(decoded, extract_faces([images[i] for i in decoded])):
+                faces_per_image[i] = faces
+            timer.add("embed", len(chunk), time.perf_counter() - t0)
+
+            # (metadata, row id, photo to store, embedding) per new row
+            items = []
+            for meta, image, faces in zip(chunk, images, faces_per_image):
+                if not faces:
+                    skipped += 1
+                    print(f"[SKIP] {meta['image']}: no face detected")
+                elif all_faces and kind == "public" and len(faces) > 1:
+                    for n, face in enumerate(faces):
+                        face_id = meta["_id"] if n == 0 else case_id_for(kind, f"{meta['image']}#{n}")
+                        items.append((meta, face_id, crop_face(image, face["bbox"]), face["embedding"]))
+                else:
+                    items.append((meta, meta["_id"], image, faces[0]["embedding"]))
+
+            landmarks = [None] * len(items)
+            if face_mesh:
+                t0 = time.perf_counter()
+                landmarks = list(mesh_threads.map(extract_landmarks, [item[2] for item in items]))
+                timer.add("mesh", len(items), time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            new_rows = []
+            for (meta, row_id, photo, embedding), mesh in zip(items, landmarks):
+                image_store.save_image(row_id, PIL.Image.fromarray(photo))
+                new_rows.append(build_row(kind, row_id, meta, embedding, mesh, submitted_by))
+            insert(new_rows)  # one transaction per chunk
+            inserted += len(new_rows)
+            timer.add("insert", len(new_rows), time.perf_counter() - t0)
+
+            print(f"[{start + len(chunk)}/{len(pending)}] inserted {inserted}, skipped {skipped}")
+
+    print(f"✅ Done: {inserted} inserted, {skipped} skipped")
+    timer.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest cases or sightings from image folders")
+    parser.add_argument("kind", choices=sorted(MODELS))
+    parser.add_argument("--images", required=True, help="Directory containing the photos")
+    parser.add_argument("--metadata", required=True, help="CSV or JSONL file, one row per photo")
+    parser.add_argument("--submitted-by", default=None, help="Default submitted_by for rows without one")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Rows per insert transaction")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Image decode processes")
+    parser.add_argument("--face-mesh", action="store_true", help="Also store MediaPipe face mesh landmarks")
+    parser.add_argument("--all-faces", action="store_true", help="public: one sighting per detected face")
+    args = parser.parse_args()
+
+    if args.kind == "registered" and not args.submitted_by:
+        parser.error("--submitted-by is required for registered cases")
+    ingest(
+        args.kind, args.images, args.metadata, args.submitted_by,
+        args.chunk_size, args.workers, args.face_mesh, args.all_faces,
+    )
+
+
+if __name__ == "__main__":
+    main()
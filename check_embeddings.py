@@ -1,5 +1,5 @@
 from pages.helper import db_queries
-import json
+from pages.helper.embedding_codec import decode_embedding
 
 # Fetch one registered and one public case
 reg = db_queries.fetch_registered_cases(train_data=True)
@@ -8,7 +8,7 @@ pub = db_queries.fetch_public_cases(train_data=True)
 print("\n--- REGISTERED CASE ---")
 if reg:
     print("ID:", reg[0][0])
-    emb = json.loads(reg[0][1])
+    emb = decode_embedding(reg[0][1])
     print("Embedding length:", len(emb))
     print("First 5 values:", emb[:5])
 else:
@@ -17,7 +17,7 @@ else:
 print("\n--- PUBLIC CASE ---")
 if pub:
     print("ID:", pub[0][0])
-    emb = json.loads(pub[0][1])
+    emb = decode_embedding(pub[0][1])
     print("Embedding length:", len(emb))
     print("First 5 values:", emb[:5])
 else:
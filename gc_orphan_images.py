@@ -0,0 +1,30 @@
+"""
+Delete photos in ./resources that belong to no registered case or sighting.
+
+Uploads are stored as soon as they are processed; if the form is never saved
+the file is left behind. The pages clean up replaced uploads within a session,
+this catches the rest (closed tabs, crashes).
+
+    python gc_orphan_images.py [--min-age-hours 24] [--dry-run]
+"""
+import argparse
+
+from pages.helper import image_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove orphaned case photos and thumbnails")
+    parser.add_argument("--min-age-hours", type=float, default=image_store.ORPHAN_MIN_AGE / 3600,
+                        help="Only remove files older than this")
+    parser.add_argument("--dry-run", action="store_true", help="List orphans without deleting them")
+    args = parser.parse_args()
+
+    orphans = image_store.collect_orphans(args.min_age_hours * 3600, dry_run=args.dry_run)
+    for case_id in orphans:
+        print(f"  {image_store.original_path(case_id)}")
+    action = "Found" if args.dry_run else "Removed"
+    print(f"✅ {action} {len(orphans)} orphaned photos")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-from sqlmodel import SQLModel, create_engine
-from pages.helper.data_models import RegisteredCases, PublicSubmissions
+from sqlmodel import SQLModel
+from pages.helper.data_models import RegisteredCases, PublicSubmissions, Matches
+from pages.helper.database import get_engine
 
-# Path to your SQLite DB
-sqlite_url = "sqlite:///sqlite_database.db"
-engine = create_engine(sqlite_url)
+# Shared engine (path from SVR_DATABASE_URL, default sqlite_database.db)
+engine = get_engine()
 
 def create_tables():
     SQLModel.metadata.create_all(engine)
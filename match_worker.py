@@ -0,0 +1,63 @@
+"""
+Background matching worker.
+
+Polls the database for new/changed NF registered cases and public sightings,
+scores only the delta exactly (match_algo incremental mode) and writes the
+results to the `matches` table, which the Match Cases page reads. With --gc-interval it
+also removes photos of uploads that were never saved as a case.
+
+    python match_worker.py [--interval 10] [--blas-threads 4] [--threshold 0.35] [--once] [--gc-interval 3600]
+"""
+import time
+import argparse
+import traceback
+
+from pages.helper import db_queries, image_store, match_algo
+
+
+def run_once(threshold, blas_threads, last_scores=None):
+    """Run one incremental pass; returns the scores written (or kept)."""
+    start = time.perf_counter()
+    result = match_algo.match(threshold=threshold, incremental=True, blas_threads=blas_threads)
+    scores = result.get("scores", {}) if result["status"] else {}
+
+    if scores != last_scores:
+        db_queries.replace_matches(scores)
+        print(f"[WORKER] wrote {len(scores)} matches in {time.perf_counter() - start:.2f}s")
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background matching worker")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between polls")
+    parser.add_argument("--blas-threads", type=int, default=4,
+                        help="BLAS threads used to score sightings (needs threadpoolctl)")
+    parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    parser.add_argument("--gc-interval", type=float, default=0,
+                        help="Seconds between orphaned-photo cleanups (0 = off)")
+    args = parser.parse_args()
+
+    db_queries.create_db()
+    last_scores = None
+    last_gc = 0.0
+    while True:
+        try:
+            last_scores = run_once(args.threshold, args.blas_threads, last_scores)
+        except Exception:
+            traceback.print_exc()
+        if args.gc_interval and time.monotonic() - last_gc >= args.gc_interval:
+            try:
+                orphans = image_store.collect_orphans()
+                if orphans:
+                    print(f"[WORKER] removed {len(orphans)} orphaned photos")
+            except Exception:
+                traceback.print_exc()
+            last_gc = time.monotonic()
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Convert stored embeddings and face mesh landmarks from JSON text to the binary
+BLOB format in place.
+
+Replaces the old add_column_embedding.py: the `embedding` column is added if it
+is missing, then every JSON row is re-encoded with embedding_codec. Landmarks
+are always stored as float32 (--dtype only applies to embeddings).
+
+    python migrate_embeddings.py [--db sqlite_database.db] [--dtype float32|float16] [--vacuum]
+"""
+import os
+import json
+import argparse
+
+from pages.helper.database import get_engine, sqlite_url
+from pages.helper.embedding_codec import encode_embedding, encode_landmarks
+
+TABLES = ["registeredcases", "publicsubmissions", "uploadcache"]
+BATCH_SIZE = 500
+
+
+def ensure_embedding_column(conn, table):
+    if "embedding" not in table_columns(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN embedding BLOB")
+        print(f"✅ Column 'embedding' added to {table}")
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
+
+
+def migrate_column(conn, table, column, encode):
+    """Re-encode every JSON text value of `column`; returns (rows, bytes_before, bytes_after)."""
+    key = "content_hash" if table == "uploadcache" else "id"
+    rows = conn.exec_driver_sql(
+        f"SELECT {key}, {column} FROM {table} WHERE typeof({column}) = 'text'"
+    ).fetchall()
+
+    converted, before, after = 0, 0, 0
+    for start in range(0, len(rows), BATCH_SIZE):
+        updates = []
+        for row_id, text in rows[start:start + BATCH_SIZE]:
+            blob = encode(json.loads(text)) if text else None
+            before += len(text.encode("utf-8"))
+            after += len(blob) if blob else 0
+            updates.append((blob, row_id))
+        conn.exec_driver_sql(f"UPDATE {table} SET {column} = ? WHERE {key} = ?", updates)
+        converted += len(updates)
+    return converted, before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate JSON embeddings and landmarks to binary BLOBs")
+    parser.add_argument("--db", default="sqlite_database.db")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args()
+
+    file_size_before = os.path.getsize(args.db)
+    engine = get_engine(sqlite_url(args.db))
+    encoders = {
+        "embedding": lambda value: encode_embedding(value, dtype=args.dtype),
+        "face_mesh": encode_landmarks,
+    }
+    total_before, total_after = 0, 0
+    with engine.begin() as conn:  # single transaction: all tables convert or none do
+        existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table in [t for t in TABLES if t in existing]:
+            ensure_embedding_column(conn, table)
+            for column, encode in encoders.items():
+                if column not in table_columns(conn, table):
+                    continue
+                rows, before, after = migrate_column(conn, table, column, encode)
+                total_before += before
+                total_after += after
+                print(f"{table}.{column}: converted {rows} rows, {before:,} → {after:,} bytes")
+    if args.vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.exec_driver_sql("VACUUM")
+    engine.dispose()
+
+    print(f"✅ Embedding + landmark payload: {total_before:,} → {total_after:,} bytes "
+          f"(saved {total_before - total_after:,})")
+    print(f"Database file: {file_size_before:,} → {os.path.getsize(args.db):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
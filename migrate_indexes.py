@@ -0,0 +1,34 @@
+"""
+Add the composite indexes declared in data_models to an existing database.
+
+    python migrate_indexes.py [--db sqlite_database.db]
+
+Safe to run repeatedly: indexes that already exist are skipped. Runs ANALYZE
+afterwards so SQLite's planner picks the new indexes up.
+"""
+import argparse
+
+from pages.helper import db_queries
+from pages.helper.database import get_engine, sqlite_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create missing indexes")
+    parser.add_argument("--db", default=None, help="SQLite file (defaults to the app database)")
+    args = parser.parse_args()
+
+    if args.db:
+        db_queries.engine = get_engine(sqlite_url(args.db))
+
+    created = db_queries.create_indexes()
+    with db_queries.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    if created:
+        print(f"✅ Created indexes: {', '.join(created)}")
+    else:
+        print("✅ All indexes already present")
+
+
+if __name__ == "__main__":
+    main()
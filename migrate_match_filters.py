@@ -0,0 +1,52 @@
+"""
+Prepare an existing database for candidate blocking (match_filters).
+
+Adds the region / registered_on / approx_age columns and their indexes if
+missing, then assigns a region to every case and sighting from its last seen,
+address or location text using the `regions` of match_filters.yml. Rerun with
+--all after changing the regions to re-bucket every row. Existing cases keep
+an empty registered_on (unknown dates never exclude a case).
+
+    python migrate_match_filters.py [--db sqlite_database.db] [--all]
+"""
+import argparse
+
+from pages.helper import db_queries, match_filters
+from pages.helper.database import get_engine, sqlite_url
+
+BATCH_SIZE = 500
+
+
+def assign_regions(conn, table, text_columns, rules, everything):
+    where = "" if everything else " WHERE region IS NULL"
+    rows = conn.exec_driver_sql(f"SELECT id, {', '.join(text_columns)} FROM {table}{where}").fetchall()
+    updates = [(match_filters.region_of(*row[1:], rules=rules), row[0]) for row in rows]
+    for start in range(0, len(updates), BATCH_SIZE):
+        conn.exec_driver_sql(f"UPDATE {table} SET region = ? WHERE id = ?", updates[start:start + BATCH_SIZE])
+    return sum(1 for region, _ in updates if region is not None), len(updates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add match filter columns and assign regions")
+    parser.add_argument("--db", default=None, help="SQLite file (defaults to the app database)")
+    parser.add_argument("--all", action="store_true", help="Re-assign regions of rows that already have one")
+    args = parser.parse_args()
+
+    if args.db:
+        db_queries.engine = get_engine(sqlite_url(args.db))
+
+    # Missing tables, columns and indexes
+    db_queries.create_db()
+
+    rules = match_filters.load_rules()
+    if not rules["regions"]:
+        print(f"[WARN] No regions configured in {match_filters.CONFIG_PATH}; regions stay empty")
+    with db_queries.engine.begin() as conn:
+        for table, columns in (("registeredcases", ["last_seen", "address"]), ("publicsubmissions", ["location"])):
+            assigned, total = assign_regions(conn, table, columns, rules, args.all)
+            print(f"✅ {table}: {assigned} of {total} rows assigned a region")
+        conn.exec_driver_sql("ANALYZE")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
-import uuid
 import numpy as np
 import streamlit as st
-import json
 import base64
 
 from pages.helper.data_models import RegisteredCases
-from pages.helper import db_queries
-from pages.helper.utils import image_obj_to_numpy, extract_face_mesh_landmarks
-from pages.helper.streamlit_helpers import require_login
+from pages.helper import db_queries, upload_cache
+from pages.helper.embedding_codec import encode_embedding, encode_landmarks
+from pages.helper.utils import extract_face_mesh_landmarks
+from pages.helper.streamlit_helpers import require_login, process_upload_once, upload_saved, mark_upload_saved
 from pages.helper.face_recognition_model import extract_embedding  # ✅ InsightFace model
 
 # -------------------- #
@@ -32,7 +31,7 @@ elif st.session_state["login_status"]:
     image_col, form_col = st.columns(2)
     image_obj = None
     save_flag = 0
-    embedding_str = None
+    embedding_blob = None
     face_mesh = None
     unique_id = None
 
@@ -44,35 +43,36 @@ elif st.session_state["login_status"]:
             key="new_case"
         )
 
-        if image_obj:
-            unique_id = str(uuid.uuid4())
-            uploaded_file_path = f"./resources/{unique_id}.jpg"
-
-            # Save uploaded image
-            with open(uploaded_file_path, "wb") as output_temporary_file:
-                output_temporary_file.write(image_obj.read())
+        # Process Image (once per uploaded file, not on every form rerun)
+        with st.spinner("Processing image and extracting facial features..."):
+            # ✅ 512-D InsightFace embedding + (optional) MediaPipe face mesh,
+            # reused from the upload cache when this photo was seen before
+            unique_id, processed = process_upload_once(
+                "register_upload",
+                image_obj,
+                lambda image: (extract_embedding(image, portrait=True), extract_face_mesh_landmarks(image)),
+                pipeline="portrait",
+            )
 
-            # Process Image
-            with st.spinner("Processing image and extracting facial features..."):
-                st.image(image_obj, caption="Uploaded Image", use_container_width=False)
-                image_numpy = image_obj_to_numpy(uploaded_file_path)
+        if image_obj:
+            st.image(processed["image"], caption="Uploaded Image", use_container_width=False)
 
-                # ✅ Extract 512-D InsightFace embedding
-                embedding = extract_embedding(image_numpy)
-                if embedding is None:
-                    st.error("⚠️ No face detected. Please upload a clear image.")
-                    st.stop()
+            embedding = processed["embedding"]
+            if embedding is None:
+                st.error("⚠️ No face detected. Please upload a clear image.")
+                st.stop()
 
-                # Convert embedding to JSON string for DB
-                embedding_str = json.dumps(embedding.tolist())
+            # Pack embedding into a binary float32 BLOB for DB
+            embedding_blob = encode_embedding(embedding)
+            face_mesh = processed["face_mesh"]
 
-                # (Optional) MediaPipe face mesh landmarks
-                face_mesh = extract_face_mesh_landmarks(image_numpy)
+            for duplicate_id, kind in processed["duplicates"]:
+                st.warning(f"⚠️ This photo looks like an existing {kind} case: {duplicate_id}")
 
     # ------------------------- #
     # Form for case details
     # ------------------------- #
-    if image_obj and embedding_str:
+    if image_obj and embedding_blob:
         with form_col.form(key="new_case"):
             st.subheader("Case Information")
 
@@ -91,7 +91,10 @@ elif st.session_state["login_status"]:
 
             submit_bt = st.form_submit_button("Save Case")
 
-            if submit_bt:
+            if submit_bt and upload_saved("register_upload"):
+                st.info("This case has already been saved.")
+
+            elif submit_bt:
                 new_case_details = RegisteredCases(
                     id=unique_id,
                     submitted_by=user,
@@ -100,8 +103,8 @@ elif st.session_state["login_status"]:
                     age=age,
                     complainant_mobile=mobile_number,
                     complainant_name=complainant_name,
-                    face_mesh=json.dumps(face_mesh) if face_mesh else None,
-                    embedding=embedding_str,  # ✅ Store embedding
+                    face_mesh=encode_landmarks(face_mesh),
+                    embedding=embedding_blob,  # ✅ Store embedding
                     adhaar_card=adhaar_card,
                     birth_marks=birthmarks,
                     address=address,
@@ -111,6 +114,8 @@ elif st.session_state["login_status"]:
                 )
 
                 db_queries.register_new_case(new_case_details)
+                upload_cache.record_case(processed["content_hash"], unique_id)
+                mark_upload_saved("register_upload")
                 save_flag = 1
 
         if save_flag:
@@ -1,47 +1,39 @@
 import streamlit as st
-import os
-from pages.helper import db_queries
+from pages.helper import db_queries, image_store
 from pages.helper.streamlit_helpers import require_login
 
 def case_viewer(case):
+    # Row from db_queries.list_registered_cases: case fields, embedding flag and
+    # the matched sighting's details all come from one joined query
     case = list(case)
     case_id = case.pop(0)
-    matched_with_id = case.pop(-1)
-    matched_with_details = None
-
-    try:
-        matched_with_id = matched_with_id.replace("{", "").replace("}", "")
-    except Exception:
-        matched_with_id = None
-
-    if matched_with_id:
-        matched_with_details = db_queries.get_public_case_detail(matched_with_id)
+    has_embedding = case[5]
+    matched_with_details = case[6:10]
 
     data_col, image_col, matched_with_col = st.columns(3)
     for text, value in zip(["Name", "Age", "Status", "Last Seen", "Phone"], case[:5]):
         value = "Found" if value == "F" else "Not Found" if value == "NF" else value
         data_col.write(f"{text}: {value}")
 
-        # Display embedding availability
-    embedding_check = db_queries.get_embedding_for_case(case_id)
-    if embedding_check:
+    # Display embedding availability
+    if has_embedding:
         data_col.write("Face embedding: Available")
     else:
         data_col.write("Face embedding: Missing")
 
 
-    # Show image (handle missing file gracefully)
-    image_path = f"./resources/{case_id}.jpg"
-    if os.path.exists(image_path):
-        image_col.image(image_path, width=120, use_container_width=False)
+    # Show thumbnail (handle missing file gracefully)
+    thumb = image_store.thumbnail(case_id)
+    if thumb:
+        image_col.image(thumb, width=120, use_container_width=False)
     else:
         image_col.warning("Image not found")
 
-    if matched_with_details:
-        matched_with_col.write(f"Location: {matched_with_details[0][0]}")
-        matched_with_col.write(f"Submitted By: {matched_with_details[0][1]}")
-        matched_with_col.write(f"Mobile: {matched_with_details[0][2]}")
-        matched_with_col.write(f"Birth Marks: {matched_with_details[0][3]}")
+    if any(value is not None for value in matched_with_details):
+        matched_with_col.write(f"Location: {matched_with_details[0]}")
+        matched_with_col.write(f"Submitted By: {matched_with_details[1]}")
+        matched_with_col.write(f"Mobile: {matched_with_details[2]}")
+        matched_with_col.write(f"Birth Marks: {matched_with_details[3]}")
     st.write("---")
 
     # Delete button with confirmation
@@ -64,9 +56,7 @@ def case_viewer(case):
 
         if st.button("Yes, Delete", key=yes_key):
             db_queries.delete_registered_case(case_id)
-            image_path = f"./resources/{case_id}.jpg"
-            if os.path.exists(image_path):
-                os.remove(image_path)
+            image_store.delete_images(case_id)
             st.success("Case deleted!")
             st.session_state[confirm_key] = False
             st.rerun()
@@ -87,9 +77,9 @@ def public_case_viewer(case: list) -> None:
             value = "Found" if value == "F" else "Not Found"
         data_col.write(f"{text}: {value}")
 
-    image_path = f"./resources/{case_id}.jpg"
-    if os.path.exists(image_path):
-        image_col.image(image_path, width=120, use_container_width=False)
+    thumb = image_store.thumbnail(case_id)
+    if thumb:
+        image_col.image(thumb, width=120, use_container_width=False)
     else:
         image_col.warning("Image not found")
 
@@ -100,11 +90,36 @@ def public_case_viewer(case: list) -> None:
     if st.button("Delete Public Case", key=delete_key):
         if st.confirm(f"Are you sure you want to delete public case {case_id}?"):
             db_queries.delete_public_case(case_id)
-            if os.path.exists(image_path):
-                os.remove(image_path)
+            image_store.delete_images(case_id)
             st.success("Public case deleted!")
             st.experimental_rerun()
 
+def paginate(key, fetch_page, page_size):
+    """
+    Keyset pagination: keeps a stack of "after" cursors in session state and
+    fetches one extra row to know whether a next page exists.
+    """
+    cursors_key = f"{key}_cursors"
+    if st.session_state.get(f"{key}_page_size") != page_size:
+        st.session_state[cursors_key] = [None]
+        st.session_state[f"{key}_page_size"] = page_size
+    cursors = st.session_state.setdefault(cursors_key, [None])
+
+    rows = fetch_page(after=cursors[-1], page_size=page_size + 1)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    info_col.write(f"Page {len(cursors)}")
+    if next_col.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+        cursors.append(rows[-1][0])
+        st.rerun()
+    return rows
+
+
 if "login_status" not in st.session_state:
     st.write("You don't have access to this page")
 
@@ -113,21 +128,26 @@ elif st.session_state["login_status"]:
 
     st.title("View Submitted Cases")
 
-    status_col, date_col = st.columns(2)
+    status_col, date_col, size_col = st.columns(3)
     status = status_col.selectbox(
         "Filter", options=["All", "Not Found", "Found", "Public Cases"]
     )
     date = date_col.date_input("Date")
+    page_size = size_col.selectbox("Cases per page", [10, 25, 50, 100], index=1)
 
     if status == "Public Cases":
-        cases_data = db_queries.fetch_public_cases(False, status)
+        cases_data = paginate("public", db_queries.list_public_cases, page_size)
         st.write("\n\n")
         st.write("---")
         for case in cases_data:
             public_case_viewer(case)
 
     else:
-        cases_data = db_queries.fetch_registered_cases(user, status)
+        cases_data = paginate(
+            f"registered_{status}",
+            lambda **page: db_queries.list_registered_cases(user, status, **page),
+            page_size,
+        )
         st.write("\n\n")
         st.write("---")
         for case in cases_data:
@@ -1,6 +1,8 @@
 import streamlit as st
 
-from pages.helper import db_queries, match_algo, train_model
+from collections import defaultdict
+
+from pages.helper import db_queries, image_store, match_algo, match_state
 from pages.helper.streamlit_helpers import require_login
 
 
@@ -21,15 +23,12 @@ def case_viewer(registered_case_id, public_case_id):
             "Status Changed. Next time it will be only visible in confirmed cases page"
         )
 
-        # Display image
-        try:
-            image_col.image(
-                "./resources/" + registered_case_id + ".jpg",
-                width=80,
-                use_container_width=False,
-            )
-        except Exception as img_err:
-            st.warning(f"Could not load image: {str(img_err)}")
+        # Display thumbnail
+        thumb = image_store.thumbnail(registered_case_id)
+        if thumb:
+            image_col.image(thumb, width=80, use_container_width=False)
+        else:
+            st.warning("Could not load image")
 
     except Exception as e:
         import traceback
@@ -38,6 +37,33 @@ def case_viewer(registered_case_id, public_case_id):
         st.error(f"Something went wrong: {str(e)}. Please check logs")
 
 
+def candidates_viewer(registered_case_id, candidates, sighting_details):
+    """
+    Show a registered case with its ranked candidate sightings (no status change).
+    sighting_details comes from one db_queries.get_public_case_details call per page.
+    """
+    case_details = db_queries.get_registered_case_detail(registered_case_id)
+    if not case_details:
+        return
+    data_col, image_col = st.columns(2)
+    for text, value in zip(["Name", "Mobile", "Age", "Last Seen", "Birth marks"], case_details[0]):
+        data_col.write(f"{text}: {value}")
+    thumb = image_store.thumbnail(registered_case_id)
+    if thumb:
+        image_col.image(thumb, width=80, use_container_width=False)
+
+    for rank, (public_case_id, similarity) in enumerate(candidates, start=1):
+        rank_col, sighting_col, sighting_image_col = st.columns([1, 3, 2])
+        rank_col.write(f"#{rank}  ({similarity:.3f})")
+        details = sighting_details.get(public_case_id)
+        if details:
+            sighting_col.write(f"Location: {details[0]}")
+            sighting_col.write(f"Mobile: {details[2]}")
+        sighting_thumb = image_store.thumbnail(public_case_id)
+        if sighting_thumb:
+            sighting_image_col.image(sighting_thumb, width=80, use_container_width=False)
+
+
 if "login_status" not in st.session_state:
     st.write("You don't have access to this page")
 
@@ -49,23 +75,84 @@ elif st.session_state["login_status"]:
     col1, col2 = st.columns(2)
 
     refresh_bt = col1.button("Refresh")
+    view = col2.selectbox("View", ["Best match", "Top candidates", "Live scan"])
     st.write("---")
 
-    if refresh_bt:
-        with st.spinner("Fetching Data and Training Model..."):
-            result = train_model.train(user)
-
-            matched_ids = match_algo.match()
+    if view == "Top candidates":
+        k = col2.number_input("Candidates per case", min_value=1, max_value=20, value=5, step=1)
+        if refresh_bt or st.session_state.get("top_k_params") != k:
+            with st.spinner("Ranking candidates..."):
+                st.session_state["top_k_result"] = match_algo.match_top_k(k=int(k))
+                st.session_state["top_k_params"] = k
+
+        ranked = st.session_state["top_k_result"]
+        by_case = list(ranked["by_case"].items()) if ranked["status"] else []
+        if not by_case:
+            st.info("No match found")
+        else:
+            page_col, size_col = st.columns(2)
+            page_size = size_col.selectbox("Cases per page", [5, 10, 25, 50], index=1)
+            n_pages = (len(by_case) + page_size - 1) // page_size
+            page = page_col.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1)
+            shown = by_case[(page - 1) * page_size:page * page_size]
+            # All candidate sightings on this page in one query
+            sighting_details = db_queries.get_public_case_details(
+                public_id for _, candidates in shown for public_id, _ in candidates
+            )
+            for registered_id, candidates in shown:
+                candidates_viewer(registered_id, candidates, sighting_details)
+                st.write("---")
+
+    elif view == "Live scan":
+        # Full exact scan streamed chunk by chunk: results appear while it runs
+        if refresh_bt:
+            status = st.empty()
+            found = 0
+            for chunk in match_algo.match_stream(k=3):
+                # Case names for the whole chunk in one query
+                case_details = db_queries.get_registered_case_details(
+                    registered_id for _, candidates in chunk for registered_id, _ in candidates
+                )
+                for public_id, candidates in chunk:
+                    found += 1
+                    sighting_col, case_col = st.columns(2)
+                    sighting_thumb = image_store.thumbnail(public_id)
+                    if sighting_thumb:
+                        sighting_col.image(sighting_thumb, width=80, use_container_width=False)
+                    for registered_id, similarity in candidates:
+                        details = case_details.get(registered_id)
+                        if details:
+                            case_col.write(f"{details[0]} ({similarity:.3f})")
+                    st.write("---")
+                status.caption(f"Scanning... {found} sightings matched so far")
+            status.caption(f"Scan complete: {found} sightings matched")
+            if not found:
+                st.info("No match found")
 
-            if matched_ids["status"]:
-                if not matched_ids["result"]:
-                    st.info("No match found")
-                else:
-                    for matched_id, submitted_case_id in matched_ids["result"].items():
-                        case_viewer(matched_id, submitted_case_id[0])
-                        st.write("---")
-            else:
+    elif refresh_bt:
+        with st.spinner("Fetching Data..."):
+            # Matches are precomputed by match_worker.py; this is a single read
+            matches = db_queries.fetch_matches()
+            matched_ids = defaultdict(list)
+            for registered_id, public_id, similarity, matched_on in matches:
+                matched_ids[registered_id].append(public_id)
+
+            # An empty table is the normal state when nothing matches or every
+            # match was confirmed: never fall back to a full scan here
+            last_run = match_state.last_run()
+            if matches:
+                st.caption(f"Last computed: {max(m[3] for m in matches):%Y-%m-%d %H:%M:%S}")
+            elif last_run:
+                st.caption(f"Last matching run: {last_run:%Y-%m-%d %H:%M:%S}")
+
+            if not matched_ids and last_run is None:
+                st.info("No match found: the matching worker has not run yet (start match_worker.py)")
+            elif not matched_ids:
                 st.info("No match found")
+            else:
+                for matched_id, submitted_case_id in matched_ids.items():
+                    case_viewer(matched_id, submitted_case_id[0])
+                    st.write("---")
 
 else:
     st.write("You don't have access to this page")
@@ -1,59 +1,94 @@
 import streamlit as st
-import uuid
 import os
-import json
-from pages.helper.utils import image_obj_to_numpy, extract_face_mesh_landmarks, extract_face_embedding  # ✅ ensure embedding extractor is imported
+import shutil
+import tempfile
+from pages.helper.utils import extract_face_mesh_landmarks
+from pages.helper.face_recognition_model import extract_embedding  # ✅ same extractor as the Home page
 from pages.helper.data_models import PublicSubmissions
-from pages.helper import db_queries
+from pages.helper import db_queries, upload_cache, video_ingest
+from pages.helper.embedding_codec import encode_embedding, encode_landmarks
+from pages.helper.streamlit_helpers import process_upload_once, upload_saved, mark_upload_saved
 
 st.title("Report a Spotted Person")
 
 image = st.file_uploader("Upload Image", type=["jpg", "jpeg", "png"])
+# ✅ Face mesh landmarks + InsightFace embedding, computed once per uploaded
+# file (not on every form rerun) and reused from the upload cache when the
+# same photo was already submitted
+case_id, processed = process_upload_once(
+    "report_upload",
+    image,
+    lambda img: (extract_embedding(img), extract_face_mesh_landmarks(img)),
+)
 if image:
-    case_id = str(uuid.uuid4())
-    img_path = f"./resources/{case_id}.jpg"
-    with open(img_path, "wb") as f:
-        f.write(image.read())
+    st.image(processed["image"], width=200)
+    face_mesh = processed["face_mesh"]
+    embedding_vector = processed["embedding"]
 
-    st.image(image, width=200)
-    st.info("Processing image...")
+    if processed["duplicates"]:
+        st.warning("⚠️ This photo has already been submitted. Thank you, it is being matched.")
 
-    # ✅ Convert image to numpy array
-    img_array = image_obj_to_numpy(img_path)
-
-    # ✅ Extract face mesh landmarks
-    face_mesh = extract_face_mesh_landmarks(img_array)
-
-    # ✅ Extract embedding using your InsightFace model (you already have this function)
-    embedding_vector = extract_face_embedding(img_array)
-
-    if face_mesh and embedding_vector is not None:
+    if face_mesh is not None and embedding_vector is not None:
         with st.form("public_case_form"):
             location = st.text_input("Location Seen")
             mobile = st.text_input("Your Mobile Number")
             email = st.text_input("Your Email (optional)")
             birth_marks = st.text_input("Birth Marks (if any)")
+            approx_age = st.number_input("Approximate Age (0 if unsure)", min_value=0, max_value=100, value=0, step=1)
             submit = st.form_submit_button("Submit")
 
-            if submit:
-                # ✅ Convert embedding to JSON string
-                embedding_json = json.dumps(embedding_vector.tolist())
+            if submit and upload_saved("report_upload"):
+                st.info("This sighting has already been submitted.")
+
+            elif submit:
+                # ✅ Pack embedding into a binary float32 BLOB
+                embedding_blob = encode_embedding(embedding_vector)
 
                 # ✅ Create the PublicSubmissions object with embedding
                 public_case = PublicSubmissions(
                     id=case_id,
                     submitted_by="public_user",
-                    face_mesh=json.dumps(face_mesh),
-                    embedding=embedding_json,   # ✅ store embedding
+                    face_mesh=encode_landmarks(face_mesh),
+                    embedding=embedding_blob,   # ✅ store embedding
                     location=location,
                     mobile=mobile,
                     status="NF",
                     birth_marks=birth_marks,
+                    approx_age=approx_age or None,
                 )
 
                 # ✅ Save to database
                 db_queries.new_public_case(public_case)
+                upload_cache.record_case(processed["content_hash"], case_id)
+                mark_upload_saved("report_upload")
                 st.success("Case submitted! We will try to match this with missing persons.")
 
     else:
         st.error("No valid face detected. Please upload a clear image showing a face.")
+
+
+# 🎥 Video clips / CCTV footage: every person tracked in the clip becomes a sighting
+with st.expander("Upload a video clip instead"):
+    video = st.file_uploader("Upload Video", type=["mp4", "avi", "mov", "mkv"], key="report_video")
+    video_location = st.text_input("Location Seen", key="video_location")
+    video_mobile = st.text_input("Your Mobile Number", key="video_mobile")
+    if video and st.button("Process video"):
+        # OpenCV needs a file path; the name only keeps the extension (sighting IDs
+        # come from the file's SHA-256, so re-uploads don't duplicate sightings)
+        video_dir = tempfile.mkdtemp()
+        video_path = os.path.join(video_dir, os.path.basename(video.name))
+        try:
+            with open(video_path, "wb") as f:
+                shutil.copyfileobj(video, f)
+            with st.spinner("Scanning video for faces..."):
+                result = video_ingest.ingest_video(
+                    video_path, location=video_location, mobile=video_mobile
+                )
+            st.success(
+                f"Found {result['tracks']} people, submitted {result['sightings']} new sightings "
+                f"in {result['seconds']}s."
+            )
+        except Exception as e:
+            st.error(f"⚠️ Could not process video: {e}")
+        finally:
+            shutil.rmtree(video_dir, ignore_errors=True)
@@ -1,10 +1,18 @@
 from uuid import uuid4
 from datetime import datetime
-from sqlmodel import Field, create_engine, SQLModel
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
 from typing import Optional
 
 class RegisteredCases(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # Dashboard counts and "my cases" listings filter on both columns
+        Index("ix_registeredcases_submitted_by_status", "submitted_by", "status"),
+        # Candidate blocking before matching (see match_filters)
+        Index("ix_registeredcases_status_region", "status", "region"),
+        Index("ix_registeredcases_status_registered_on", "status", "registered_on"),
+        {"extend_existing": True},
+    )
     id: str = Field(default=None, primary_key=True)
     submitted_by: str
     name: str
@@ -17,28 +25,65 @@ class RegisteredCases(SQLModel, table=True):
     address: Optional[str] = None
     last_seen: Optional[str] = None
     description: Optional[str] = None
-    face_mesh: Optional[str] = None
-    embedding: Optional[str] = None   # ✅ NEW — stores InsightFace embedding
+    face_mesh: Optional[bytes] = None   # float32 (478 x 3) landmarks (see embedding_codec)
+    embedding: Optional[bytes] = None   # ✅ binary float32/float16 InsightFace embedding (see embedding_codec)
     status: str = "NF"
     matched_with: Optional[str] = None
+    region: Optional[str] = None        # bucket of last_seen/address (see match_filters)
+    registered_on: Optional[datetime] = Field(default_factory=datetime.now)
 
 
 class PublicSubmissions(SQLModel, table=True):
-    __table_args__ = {"extend_existing": True} 
+    __table_args__ = (
+        # Matching and listings read NF sightings, newest first
+        Index("ix_publicsubmissions_status_submitted_on", "status", "submitted_on"),
+        {"extend_existing": True},
+    )
     id: str = Field(default=None, primary_key=True)
     submitted_by: Optional[str] = None
     mobile: Optional[str] = None
     location: Optional[str] = None
     birth_marks: Optional[str] = None
-    face_mesh: Optional[str] = None
-    embedding: Optional[str] = None   # ✅ NEW — stores embedding
+    face_mesh: Optional[bytes] = None   # float32 (478 x 3) landmarks (see embedding_codec)
+    embedding: Optional[bytes] = None   # ✅ binary embedding (see embedding_codec)
     status: str = "NF"
     submitted_on: datetime = Field(default_factory=datetime.now)
+    region: Optional[str] = None        # bucket of location (see match_filters)
+    approx_age: Optional[int] = None    # reporter's estimate, if given
+
+
+class Matches(SQLModel, table=True):
+    """Precomputed best match per sighting, written by match_worker.py."""
+    __table_args__ = {"extend_existing": True}
+    registered_id: str = Field(primary_key=True)
+    public_id: str = Field(primary_key=True)
+    similarity: float
+    matched_on: datetime = Field(default_factory=datetime.now)
+
+
+class UploadCache(SQLModel, table=True):
+    """Results of processing an uploaded photo, keyed by a hash of its pixels (see upload_cache)."""
+    __table_args__ = (
+        # Eviction drops the least recently used entries
+        Index("ix_uploadcache_last_used", "last_used"),
+        {"extend_existing": True},
+    )
+    content_hash: str = Field(primary_key=True)   # SHA-256 of the decoded, normalized pixels
+    dhash: int                                    # 64-bit perceptual hash for near-duplicates
+    case_id: str                                  # first case stored with this photo
+    embedding: Optional[bytes] = None
+    face_mesh: Optional[bytes] = None   # float32 (478 x 3) landmarks (see embedding_codec)
+    hits: int = 0
+    created_on: datetime = Field(default_factory=datetime.now)
+    last_used: datetime = Field(default_factory=datetime.now)
 
 
 if __name__ == "__main__":
-    sqlite_url = "sqlite:///example.db"
-    engine = create_engine(sqlite_url)
+    from pages.helper.database import get_engine, sqlite_url
+
+    engine = get_engine(sqlite_url("example.db"))
 
     RegisteredCases.__table__.create(engine)
     PublicSubmissions.__table__.create(engine)
+    Matches.__table__.create(engine)
+    UploadCache.__table__.create(engine)
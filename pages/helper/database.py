@@ -0,0 +1,57 @@
+import os
+import threading
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from sqlmodel import create_engine
+
+# ✅ Single place that knows where the database lives and how it is tuned.
+# Every page, script and worker gets its engine from get_engine().
+DATABASE_URL = os.environ.get("SVR_DATABASE_URL", "sqlite:///sqlite_database.db")
+
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",       # readers don't block the writer (Streamlit + worker)
+    "synchronous": "NORMAL",     # safe with WAL, far fewer fsyncs than FULL
+    "busy_timeout": 30000,       # wait up to 30s for a lock instead of "database is locked"
+    "cache_size": -64000,        # 64 MB page cache (negative = KiB)
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+
+_engines = {}
+_lock = threading.Lock()
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def get_engine(url: str = None):
+    """Return the shared, pooled engine for `url` (defaults to DATABASE_URL)."""
+    url = url or DATABASE_URL
+    with _lock:
+        if url not in _engines:
+            if url.startswith("sqlite"):
+                engine = create_engine(
+                    url,
+                    echo=False,
+                    poolclass=QueuePool,
+                    pool_size=POOL_SIZE,
+                    max_overflow=MAX_OVERFLOW,
+                    connect_args={"check_same_thread": False, "timeout": 30},
+                )
+                event.listen(engine, "connect", _set_sqlite_pragmas)
+            else:
+                engine = create_engine(url, echo=False, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+            _engines[url] = engine
+        return _engines[url]
+
+
+def sqlite_url(path: str) -> str:
+    return f"sqlite:///{path}"
@@ -1,12 +1,16 @@
-import json
-import sqlite3
-from sqlmodel import create_engine, Session, select
+from datetime import datetime
+from sqlalchemy import bindparam, update, func, case, or_
+from sqlmodel import Session, select, delete
 
-from pages.helper.data_models import RegisteredCases, PublicSubmissions
+from pages.helper.data_models import RegisteredCases, PublicSubmissions, Matches, UploadCache
+from pages.helper import embedding_snapshot, match_filters
+from pages.helper.database import get_engine
 
-# ✅ SQLite database engine (this points to your local file)
-sqlite_url = "sqlite:///sqlite_database.db"
-engine = create_engine(sqlite_url, echo=False)
+# ✅ Shared pooled SQLite engine (WAL + tuned pragmas, see database.py)
+engine = get_engine()
+
+# SQLite caps the number of bound parameters, so large IN lists are chunked
+ID_CHUNK_SIZE = 500
 
 
 # -------------------- Database Setup --------------------
@@ -15,22 +19,89 @@ def create_db():
     try:
         RegisteredCases.__table__.create(engine, checkfirst=True)
         PublicSubmissions.__table__.create(engine, checkfirst=True)
+        Matches.__table__.create(engine, checkfirst=True)
+        UploadCache.__table__.create(engine, checkfirst=True)
+        add_missing_columns()
+        create_indexes()
     except Exception as e:
         print(f"[DB INIT ERROR] {e}")
 
 
+def add_missing_columns():
+    """Add nullable model columns that an older database doesn't have yet."""
+    added = []
+    with engine.begin() as conn:
+        for model in (RegisteredCases, PublicSubmissions, Matches, UploadCache):
+            table = model.__table__
+            existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+            if not existing:
+                continue  # table not created yet
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_indexes():
+    """Create the model-declared indexes on existing tables (no-op if present)."""
+    created = []
+    for model in (RegisteredCases, PublicSubmissions, Matches, UploadCache):
+        for index in model.__table__.indexes:
+            with engine.begin() as conn:
+                exists = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index.name,)
+                ).first()
+            if not exists:
+                index.create(engine)
+                created.append(index.name)
+    return created
+
+
 # -------------------- Case Registration --------------------
 def register_new_case(case_details: RegisteredCases):
     """Register a new case in the database."""
-    with Session(engine) as session:
-        session.add(case_details)
-        session.commit()
+    bulk_register_cases([case_details])
 
 def new_public_case(public_case_details: PublicSubmissions):
     """Register a new public submission (spotted face)."""
+    bulk_new_public_cases([public_case_details])
+
+def bulk_register_cases(cases: list):
+    """Insert many registered cases in one transaction and snapshot the NF ones together."""
+    for c in cases:
+        if c.region is None:
+            c.region = match_filters.region_of(c.last_seen, c.address)
+    items = [(c.id, c.embedding) for c in cases if c.status == "NF"]
+    with Session(engine) as session:
+        session.add_all(cases)
+        session.commit()
+    embedding_snapshot.add("registered", items)
+
+
+def bulk_new_public_cases(public_cases: list):
+    """Insert many public submissions in one transaction."""
+    for c in public_cases:
+        if c.region is None:
+            c.region = match_filters.region_of(c.location)
+    items = [(c.id, c.embedding) for c in public_cases if c.status == "NF"]
     with Session(engine) as session:
-        session.add(public_case_details)
+        session.add_all(public_cases)
         session.commit()
+    embedding_snapshot.add("public", items)
+
+
+def existing_case_ids(model, ids):
+    """Return the subset of `ids` already present in the given table."""
+    ids = list(ids)
+    found = set()
+    with Session(engine) as session:
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            chunk = ids[start:start + ID_CHUNK_SIZE]
+            found.update(session.exec(select(model.id).where(model.id.in_(chunk))).all())
+    return found
+
 
 # -------------------- Fetch Registered Cases --------------------
 def fetch_registered_cases(submitted_by: str = None, status: str = "NF", train_data: bool = False):
@@ -70,6 +141,79 @@ def fetch_registered_cases(submitted_by: str = None, status: str = "NF", train_d
         return result
 
 
+def fetch_registered_case_ids(status: str = "NF"):
+    """Return IDs of registered cases that have an embedding (no payload loaded)."""
+    with Session(engine) as session:
+        result = session.exec(
+            select(RegisteredCases.id)
+            .where(RegisteredCases.status == status)
+            .where(RegisteredCases.embedding.is_not(None))
+        ).all()
+        return result
+
+
+def list_registered_cases(
+    submitted_by: str = None, status: str = "All", after: str = None, page_size: int = 25
+):
+    """
+    One page of registered cases for listing, in a single LEFT JOIN query:
+    (id, name, age, status, last_seen, complainant_mobile, has_embedding,
+     matched location, matched submitted_by, matched mobile, matched birth_marks).
+    Keyset pagination on id: pass the last id of the previous page as `after`.
+    """
+    statuses = {"All": ["F", "NF"], "Found": ["F"]}.get(status, ["NF"])
+    # matched_with may hold legacy "{uuid}" values
+    matched_id = func.trim(RegisteredCases.matched_with, "{}")
+    with Session(engine) as session:
+        query = (
+            select(
+                RegisteredCases.id,
+                RegisteredCases.name,
+                RegisteredCases.age,
+                RegisteredCases.status,
+                RegisteredCases.last_seen,
+                RegisteredCases.complainant_mobile,
+                case((RegisteredCases.embedding.is_not(None), True), else_=False),
+                PublicSubmissions.location,
+                PublicSubmissions.submitted_by,
+                PublicSubmissions.mobile,
+                PublicSubmissions.birth_marks,
+            )
+            .outerjoin(PublicSubmissions, PublicSubmissions.id == matched_id)
+            .where(RegisteredCases.status.in_(statuses))
+            .order_by(RegisteredCases.id)
+            .limit(page_size)
+        )
+        if submitted_by:
+            query = query.where(RegisteredCases.submitted_by == submitted_by)
+        if after:
+            query = query.where(RegisteredCases.id > after)
+        return session.exec(query).all()
+
+
+def filtered_registered_case_ids(region: str = None, registered_before: datetime = None, age_range: tuple = None):
+    """
+    IDs of NF registered cases with an embedding that pass the given metadata
+    rules (see match_filters). Cases with no region or registration date are
+    kept rather than excluded.
+    """
+    with Session(engine) as session:
+        query = (
+            select(RegisteredCases.id)
+            .where(RegisteredCases.status == "NF")
+            .where(RegisteredCases.embedding.is_not(None))
+        )
+        if region is not None:
+            query = query.where(or_(RegisteredCases.region == region, RegisteredCases.region.is_(None)))
+        if registered_before is not None:
+            query = query.where(
+                or_(RegisteredCases.registered_on <= registered_before, RegisteredCases.registered_on.is_(None))
+            )
+        if age_range is not None:
+            query = query.where(RegisteredCases.age.between(*age_range))
+        return session.exec(query).all()
+
+
 # -------------------- Fetch Public Cases --------------------
 def fetch_public_cases(train_data: bool = False, status: str = "NF"):
     """Fetch public cases or embeddings for training."""
@@ -95,6 +239,93 @@ def fetch_public_cases(train_data: bool = False, status: str = "NF"):
         return result
 
 
+def fetch_public_case_ids(status: str = "NF"):
+    """Return IDs of public cases that have an embedding (no payload loaded)."""
+    with Session(engine) as session:
+        result = session.exec(
+            select(PublicSubmissions.id)
+            .where(PublicSubmissions.status == status)
+            .where(PublicSubmissions.embedding.is_not(None))
+        ).all()
+        return result
+
+
+def fetch_public_filter_fields():
+    """(id, region, submitted_on, approx_age) of NF sightings with an embedding."""
+    with Session(engine) as session:
+        return session.exec(
+            select(
+                PublicSubmissions.id,
+                PublicSubmissions.region,
+                PublicSubmissions.submitted_on,
+                PublicSubmissions.approx_age,
+            )
+            .where(PublicSubmissions.status == "NF")
+            .where(PublicSubmissions.embedding.is_not(None))
+        ).all()
+
+
+# -------------------- Fetch Embeddings by ID --------------------
+def _fetch_embeddings(model, ids):
+    ids = list(ids)
+    result = []
+    with Session(engine) as session:
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            chunk = ids[start:start + ID_CHUNK_SIZE]
+            result.extend(
+                session.exec(select(model.id, model.embedding).where(model.id.in_(chunk))).all()
+            )
+    return result
+
+
+def iter_embeddings(model, status: str = "NF", chunk_size: int = 1000):
+    """
+    Yield lists of (id, embedding) rows `chunk_size` at a time. Rows are
+    fetched from the open cursor as they are consumed (yield_per), so the
+    table is never loaded whole.
+    """
+    with Session(engine) as session:
+        result = session.exec(
+            select(model.id, model.embedding)
+            .where(model.status == status)
+            .where(model.embedding.is_not(None))
+            .execution_options(yield_per=chunk_size)
+        )
+        for partition in result.partitions():
+            yield partition
+
+
+def fetch_registered_embeddings(ids):
+    """Return (id, embedding) rows for the given registered case IDs."""
+    return _fetch_embeddings(RegisteredCases, ids)
+
+
+def fetch_public_embeddings(ids):
+    """Return (id, embedding) rows for the given public case IDs."""
+    return _fetch_embeddings(PublicSubmissions, ids)
+
+
+def list_public_cases(after: str = None, page_size: int = 25):
+    """One page of public cases for listing, keyset-paginated on id."""
+    with Session(engine) as session:
+        query = (
+            select(
+                PublicSubmissions.id,
+                PublicSubmissions.status,
+                PublicSubmissions.location,
+                PublicSubmissions.mobile,
+                PublicSubmissions.birth_marks,
+                PublicSubmissions.submitted_on,
+                PublicSubmissions.submitted_by,
+            )
+            .order_by(PublicSubmissions.id)
+            .limit(page_size)
+        )
+        if after:
+            query = query.where(PublicSubmissions.id > after)
+        return session.exec(query).all()
+
+
 # -------------------- Details and Updates --------------------
 def get_registered_case_detail(case_id: str):
     """Fetch details of a registered case by ID."""
@@ -111,6 +342,26 @@ def get_registered_case_detail(case_id: str):
         return result
 
 
+def get_registered_case_details(case_ids) -> dict:
+    """{id: (name, complainant_mobile, age, last_seen, birth_marks)} for many registered cases, in chunked IN queries."""
+    ids = list(dict.fromkeys(str(i) for i in case_ids))
+    details = {}
+    with Session(engine) as session:
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            rows = session.exec(
+                select(
+                    RegisteredCases.id,
+                    RegisteredCases.name,
+                    RegisteredCases.complainant_mobile,
+                    RegisteredCases.age,
+                    RegisteredCases.last_seen,
+                    RegisteredCases.birth_marks,
+                ).where(RegisteredCases.id.in_(ids[start:start + ID_CHUNK_SIZE]))
+            ).all()
+            details.update((row[0], tuple(row[1:])) for row in rows)
+    return details
+
+
 def get_public_case_detail(case_id: str):
     """Fetch details of a public case by ID."""
     with Session(engine) as session:
@@ -125,28 +376,58 @@ def get_public_case_detail(case_id: str):
         return result
 
 
+def get_public_case_details(case_ids) -> dict:
+    """{id: (location, submitted_by, mobile, birth_marks)} for many public cases, in chunked IN queries."""
+    ids = list(dict.fromkeys(str(i) for i in case_ids))
+    details = {}
+    with Session(engine) as session:
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            rows = session.exec(
+                select(
+                    PublicSubmissions.id,
+                    PublicSubmissions.location,
+                    PublicSubmissions.submitted_by,
+                    PublicSubmissions.mobile,
+                    PublicSubmissions.birth_marks,
+                ).where(PublicSubmissions.id.in_(ids[start:start + ID_CHUNK_SIZE]))
+            ).all()
+            details.update((row[0], tuple(row[1:])) for row in rows)
+    return details
+
+
 def update_found_status(register_case_id: str, public_case_id: str):
     """Mark both cases as found."""
-    with Session(engine) as session:
-        reg_case = session.exec(
-            select(RegisteredCases).where(RegisteredCases.id == str(register_case_id))
-        ).one()
-        pub_case = session.exec(
-            select(PublicSubmissions).where(PublicSubmissions.id == str(public_case_id))
-        ).one()
+    bulk_update_found_status([(register_case_id, public_case_id)])
 
-        reg_case.status = "F"
-        reg_case.matched_with = str(public_case_id)
-        pub_case.status = "F"
 
-        session.add(reg_case)
-        session.add(pub_case)
+def bulk_update_found_status(pairs: list):
+    """Mark many (registered_id, public_id) pairs as found in one transaction."""
+    pairs = [(str(reg_id), str(pub_id)) for reg_id, pub_id in pairs]
+    if not pairs:
+        return
+    with Session(engine) as session:
+        session.execute(
+            update(RegisteredCases.__table__)
+            .where(RegisteredCases.__table__.c.id == bindparam("reg_id"))
+            .values(status="F", matched_with=bindparam("pub_id")),
+            [{"reg_id": reg_id, "pub_id": pub_id} for reg_id, pub_id in pairs],
+        )
+        session.execute(
+            update(PublicSubmissions.__table__)
+            .where(PublicSubmissions.__table__.c.id == bindparam("pub_id"))
+            .values(status="F"),
+            [{"pub_id": pub_id} for _, pub_id in pairs],
+        )
+        # Precomputed matches of closed cases are stale from now on
+        _delete_matches(session, [reg_id for reg_id, _ in pairs], [pub_id for _, pub_id in pairs])
         session.commit()
+    embedding_snapshot.remove("registered", [reg_id for reg_id, _ in pairs])
+    embedding_snapshot.remove("public", [pub_id for _, pub_id in pairs])
 
 
 # -------------------- Embedding Access --------------------
 def get_embedding_for_case(case_id: str):
-    """Return the embedding JSON string for a registered case."""
+    """Return the stored embedding BLOB for a registered case."""
     with Session(engine) as session:
         result = session.exec(
             select(RegisteredCases.embedding).where(RegisteredCases.id == case_id)
@@ -155,7 +436,7 @@ def get_embedding_for_case(case_id: str):
 
 
 def get_embedding_for_public_case(case_id: str):
-    """Return the embedding JSON string for a public case."""
+    """Return the stored embedding BLOB for a public case."""
     with Session(engine) as session:
         result = session.exec(
             select(PublicSubmissions.embedding).where(PublicSubmissions.id == case_id)
@@ -163,13 +444,94 @@ def get_embedding_for_public_case(case_id: str):
         return result
 
 
+# -------------------- Precomputed Matches --------------------
+def _delete_matches(session, registered_ids=(), public_ids=()):
+    """Delete Matches rows of the given cases / sightings, inside the caller's transaction."""
+    for column, ids in ((Matches.registered_id, list(registered_ids)), (Matches.public_id, list(public_ids))):
+        for start in range(0, len(ids), ID_CHUNK_SIZE):
+            session.exec(delete(Matches).where(column.in_(ids[start:start + ID_CHUNK_SIZE])))
+
+
+def replace_matches(scores: dict):
+    """Replace the matches table with {(registered_id, public_id): similarity}."""
+    with Session(engine) as session:
+        session.exec(delete(Matches))
+        session.add_all(
+            Matches(registered_id=reg_id, public_id=pub_id, similarity=float(sim))
+            for (reg_id, pub_id), sim in scores.items()
+        )
+        session.commit()
+
+
+def fetch_matches():
+    """Return (registered_id, public_id, similarity, matched_on), best first."""
+    with Session(engine) as session:
+        result = session.exec(
+            select(
+                Matches.registered_id,
+                Matches.public_id,
+                Matches.similarity,
+                Matches.matched_on,
+            ).order_by(Matches.similarity.desc())
+        ).all()
+        return result
+
+
+# -------------------- Upload Cache --------------------
+def get_cached_upload(content_hash: str):
+    """Return the cache entry for a photo hash (bumping its hit count), or None."""
+    with Session(engine) as session:
+        entry = session.get(UploadCache, content_hash)
+        if entry is None:
+            return None
+        entry.hits += 1
+        entry.last_used = datetime.now()
+        session.add(entry)
+        session.commit()
+        session.refresh(entry)
+        return entry
+
+
+def save_cached_upload(entry: UploadCache, max_entries: int):
+    """Insert/replace a cache entry and evict the least recently used beyond max_entries."""
+    with Session(engine) as session:
+        session.merge(entry)
+        session.flush()
+        stale = (
+            select(UploadCache.content_hash)
+            .order_by(UploadCache.last_used.desc())
+            .offset(max_entries)
+        )
+        session.exec(delete(UploadCache).where(UploadCache.content_hash.in_(stale)))
+        session.commit()
+
+
+def set_cached_upload_case(content_hash: str, case_id: str):
+    """Point a cache entry at the case that was actually submitted with the photo."""
+    with Session(engine) as session:
+        session.exec(
+            update(UploadCache)
+            .where(UploadCache.content_hash == content_hash)
+            .values(case_id=case_id)
+        )
+        session.commit()
+
+
+def fetch_upload_dhashes():
+    """Return (dhash, case_id) for every cached photo."""
+    with Session(engine) as session:
+        return session.exec(select(UploadCache.dhash, UploadCache.case_id)).all()
+
+
 # -------------------- Delete Utilities --------------------
 def delete_registered_case(case_id: str):
     with Session(engine) as session:
         case_to_delete = session.get(RegisteredCases, case_id)
         if case_to_delete:
             session.delete(case_to_delete)
+            _delete_matches(session, registered_ids=[case_id])
             session.commit()
+    embedding_snapshot.remove("registered", [case_id])
 
 
 def delete_public_case(case_id: str):
@@ -177,18 +539,35 @@ def delete_public_case(case_id: str):
         case_to_delete = session.get(PublicSubmissions, case_id)
         if case_to_delete:
             session.delete(case_to_delete)
+            _delete_matches(session, public_ids=[case_id])
             session.commit()
+    embedding_snapshot.remove("public", [case_id])
 
-def get_registered_cases_count(submitted_by: str, status: str):
-    """Return all registered cases for a given user and status."""
-    from sqlmodel import Session, select
+def get_registered_cases_count(submitted_by: str, status: str) -> int:
+    """Return the number of registered cases for a given user and status."""
     with Session(engine) as session:
-        result = session.exec(
-            select(RegisteredCases)
+        return session.exec(
+            select(func.count())
+            .select_from(RegisteredCases)
             .where(RegisteredCases.submitted_by == submitted_by)
             .where(RegisteredCases.status == status)
-        ).all()
-        return result
+        ).one()
+
+
+def registered_case_counts(submitted_by: str = None) -> dict:
+    """Return {status: count} for registered cases in one GROUP BY query."""
+    with Session(engine) as session:
+        query = select(RegisteredCases.status, func.count()).group_by(RegisteredCases.status)
+        if submitted_by:
+            query = query.where(RegisteredCases.submitted_by == submitted_by)
+        return dict(session.exec(query).all())
+
+
+def public_case_counts() -> dict:
+    """Return {status: count} for public submissions in one GROUP BY query."""
+    with Session(engine) as session:
+        query = select(PublicSubmissions.status, func.count()).group_by(PublicSubmissions.status)
+        return dict(session.exec(query).all())
 
 
 # -------------------- Main Test --------------------
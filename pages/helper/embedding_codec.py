@@ -0,0 +1,63 @@
+import json
+import struct
+import numpy as np
+
+# Binary embedding layout: 8-byte header followed by the raw little-endian vector.
+#   magic (2s) | version (B) | dtype code (B) | dimension (I)
+# The header is 8 bytes so float32 payloads stay 4-byte aligned for np.frombuffer.
+MAGIC = b"FE"
+VERSION = 1
+HEADER = struct.Struct("<2sBBI")
+
+DTYPE_CODES = {"float32": 1, "float16": 2}
+CODE_DTYPES = {code: np.dtype(name).newbyteorder("<") for name, code in DTYPE_CODES.items()}
+
+
+def encode_embedding(embedding, dtype="float32"):
+    """Pack an embedding into a versioned binary BLOB (float32 or float16)."""
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=CODE_DTYPES[DTYPE_CODES[dtype]]).ravel()
+    return HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], vector.size) + vector.tobytes()
+
+
+def decode_embedding(value):
+    """
+    Return the embedding stored in a DB value as a read-only numpy view.
+    Legacy JSON text rows are still accepted until they are migrated.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32) if value else None
+
+    magic, version, code, dim = HEADER.unpack_from(value)
+    if magic != MAGIC or version != VERSION or code not in CODE_DTYPES:
+        raise ValueError(f"Unsupported embedding header: {magic!r} v{version} dtype={code}")
+    return np.frombuffer(value, dtype=CODE_DTYPES[code], count=dim, offset=HEADER.size)
+
+
+def encode_landmarks(landmarks):
+    """Pack face mesh landmarks (N x 3) as a float32 BLOB in the embedding format."""
+    if landmarks is None:
+        return None
+    return encode_embedding(np.asarray(landmarks, dtype=np.float32).reshape(-1))
+
+
+def decode_landmarks(value):
+    """Return stored landmarks as an (N, 3) float32 array; accepts legacy JSON text."""
+    landmarks = decode_embedding(value)
+    return None if landmarks is None else landmarks.reshape(-1, 3)
+
+
+def is_binary_embedding(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:2]) == MAGIC
+
+
+def normalize_rows(matrix, dtype=np.float32):
+    """Rows of `matrix` as L2 unit vectors of `dtype`; zero rows stay zero."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=dtype))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Zero vectors stay zero so they never beat the 0.0 starting similarity
+    norms[norms == 0] = 1.0
+    return matrix / norms
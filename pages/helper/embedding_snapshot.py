@@ -0,0 +1,344 @@
+import os
+import json
+import tempfile
+import threading
+import traceback
+import contextlib
+
+import numpy as np
+
+from pages.helper.embedding_codec import decode_embedding, normalize_rows
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# On-disk snapshot of the NF embedding matrices, one set of files per kind:
+#   embedding_snapshot/{kind}_matrix.npy  float32 (capacity, dim), L2-normalised rows
+#   embedding_snapshot/{kind}_ids.npy     fixed-width unicode (capacity,)
+#   embedding_snapshot/{kind}_meta.json   {"count", "generation"}
+# Only the first `count` rows are live. Readers np.load(mmap_mode="r") the
+# files, so the matcher, the worker and the app share the same pages and
+# nothing is decoded at startup. Writes from db_queries patch rows in place
+# while holding {kind}.lock exclusively (every process: app, worker, scripts);
+# each write bumps the generation, which readers check to detect that rows
+# moved under them (see Snapshot.is_current and reading()).
+SNAPSHOT_DIR = "embedding_snapshot"
+EMBEDDING_DIM = 512
+MIN_CAPACITY = 1024
+ID_WIDTH = 64
+KINDS = ("registered", "public")
+
+_lock = threading.Lock()
+
+
+# -------------------- Paths --------------------
+def _paths(kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown snapshot kind: {kind}")
+    base = os.path.join(SNAPSHOT_DIR, kind)
+    return f"{base}_matrix.npy", f"{base}_ids.npy", f"{base}_meta.json"
+
+
+def _read_meta(kind):
+    _, _, meta_path = _paths(kind)
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _tmp_path(path):
+    """A unique temp file next to `path`, so concurrent writers never share one."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    os.close(fd)
+    return tmp_path
+
+
+def _write_meta(kind, meta):
+    _, _, meta_path = _paths(kind)
+    tmp_path = _tmp_path(meta_path)
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def matrix_path(kind):
+    """Path of the .npy matrix, for worker processes that map it themselves."""
+    return _paths(kind)[0]
+
+
+def exists(kind):
+    return all(os.path.isfile(p) for p in _paths(kind))
+
+
+# -------------------- Locking --------------------
+@contextlib.contextmanager
+def locked(kind, shared=False):
+    """
+    Inter-process lock on one snapshot kind: exclusive for writers, shared for
+    readers that must not see rows move while they use them.
+    """
+    _paths(kind)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, f"{kind}.lock"), "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            # msvcrt has no shared mode: readers lock exclusively too
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _writing(kind):
+    """Exclusive lock for a read-modify-write, across threads and processes."""
+    with _lock, locked(kind):
+        yield
+
+
+@contextlib.contextmanager
+def reading(*kinds):
+    """Hold the shared lock of several kinds (always in KINDS order)."""
+    with contextlib.ExitStack() as stack:
+        for kind in sorted(kinds, key=KINDS.index):
+            stack.enter_context(locked(kind, shared=True))
+        yield
+
+
+# -------------------- Snapshot View --------------------
+class Snapshot:
+    """Read-only view of the live rows: `ids` and `matrix` are slices of the mmaps."""
+
+    def __init__(self, kind, ids, matrix, generation):
+        self.kind = kind
+        self.ids = ids
+        self.matrix = matrix
+        self.generation = generation
+
+    def __len__(self):
+        return len(self.ids)
+
+    def id_list(self):
+        return self.ids.tolist()
+
+    def take(self, ids):
+        """(ids, matrix) for the given case IDs that are in the snapshot, in snapshot order."""
+        rows = np.flatnonzero(np.isin(self.ids, list(ids)))
+        if len(rows) == len(self.ids):
+            return self.id_list(), self.matrix  # every row: no copy
+        return self.ids[rows].tolist(), self.matrix[rows]
+
+    def is_current(self):
+        """False once a writer has changed the snapshot since this view was loaded."""
+        try:
+            return _read_meta(self.kind)["generation"] == self.generation
+        except (OSError, ValueError, KeyError):
+            return False
+
+
+def _empty(kind):
+    return Snapshot(kind, np.empty(0, dtype=f"<U{ID_WIDTH}"), np.empty((0, EMBEDDING_DIM), np.float32), 0)
+
+
+# -------------------- Build --------------------
+def _decode(rows):
+    """(ids, normalised matrix) from (id, stored embedding) rows, skipping empty ones."""
+    ids, vectors = [], []
+    for case_id, embedding in rows:
+        if not isinstance(embedding, np.ndarray):
+            embedding = decode_embedding(embedding)
+        if embedding is not None:
+            ids.append(str(case_id))
+            vectors.append(embedding)
+    if not ids:
+        return [], np.empty((0, EMBEDDING_DIM), np.float32)
+    return ids, normalize_rows(np.vstack(vectors))
+
+
+def _write(kind, ids, matrix, generation, capacity=None):
+    """Write a fresh set of files (atomically replacing the old ones)."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    matrix_path, ids_path, _ = _paths(kind)
+    count = len(ids)
+    dim = matrix.shape[1] if count else EMBEDDING_DIM
+    capacity = max(capacity or 0, MIN_CAPACITY, count)
+    width = max([ID_WIDTH] + [len(i) for i in ids])
+
+    tmp_matrix_path, tmp_ids_path = _tmp_path(matrix_path), _tmp_path(ids_path)
+    tmp_matrix = np.lib.format.open_memmap(tmp_matrix_path, mode="w+", dtype=np.float32, shape=(capacity, dim))
+    tmp_matrix[:count] = matrix
+    tmp_matrix.flush()
+    tmp_ids = np.lib.format.open_memmap(tmp_ids_path, mode="w+", dtype=f"<U{width}", shape=(capacity,))
+    tmp_ids[:count] = ids
+    tmp_ids.flush()
+    del tmp_matrix, tmp_ids
+
+    os.replace(tmp_matrix_path, matrix_path)
+    os.replace(tmp_ids_path, ids_path)
+    _write_meta(kind, {"count": count, "generation": generation})
+
+
+def _fetch_rows(kind):
+    from pages.helper import db_queries
+
+    if kind == "registered":
+        return db_queries.fetch_registered_cases(train_data=True, status="NF")
+    return db_queries.fetch_public_cases(train_data=True, status="NF")
+
+
+def export(kind):
+    """Rebuild a snapshot from every NF case of `kind` in the DB."""
+    ids, matrix = _decode(_fetch_rows(kind))
+    with _writing(kind):
+        try:
+            generation = _read_meta(kind)["generation"] + 1
+        except (OSError, ValueError, KeyError):
+            generation = 1
+        _write(kind, ids, matrix, generation)
+    print(f"[SNAPSHOT] exported {len(ids)} {kind} embeddings")
+    return len(ids)
+
+
+# -------------------- Incremental Updates --------------------
+def _open_for_update(kind):
+    matrix_path, ids_path, _ = _paths(kind)
+    return np.load(matrix_path, mmap_mode="r+"), np.load(ids_path, mmap_mode="r+"), _read_meta(kind)
+
+
+def add(kind, items):
+    """Insert/replace (case_id, embedding) pairs; embeddings may be stored BLOBs or arrays."""
+    try:
+        new_ids, vectors = _decode(items)
+        if not new_ids or not exists(kind):
+            return
+        with _writing(kind):
+            matrix, ids, meta = _open_for_update(kind)
+            count = meta["count"]
+
+            # Cases already in the snapshot are overwritten where they are
+            current = ids[:count]
+            existing = {str(current[r]): int(r) for r in np.flatnonzero(np.isin(current, new_ids))}
+            fresh = [i for i, case_id in enumerate(new_ids) if case_id not in existing]
+            for i, case_id in enumerate(new_ids):
+                if case_id in existing:
+                    matrix[existing[case_id]] = vectors[i]
+
+            too_long = any(len(new_ids[i]) > ids.dtype.itemsize // 4 for i in fresh)
+            if count + len(fresh) > len(ids) or too_long:
+                # Out of room: rewrite with double the capacity
+                all_ids = current.tolist() + [new_ids[i] for i in fresh]
+                all_vectors = np.vstack([matrix[:count], vectors[fresh]])
+                del matrix, ids, current
+                _write(kind, all_ids, all_vectors, meta["generation"] + 1, capacity=2 * len(all_ids))
+                return
+
+            # Vector rows first, then IDs, then the count readers go by
+            matrix[count:count + len(fresh)] = vectors[fresh]
+            ids[count:count + len(fresh)] = [new_ids[i] for i in fresh]
+            matrix.flush()
+            ids.flush()
+            _write_meta(kind, {"count": count + len(fresh), "generation": meta["generation"] + 1})
+    except Exception as e:
+        print(f"[SNAPSHOT ERROR] add to {kind}: {e}")
+
+
+def remove(kind, case_ids):
+    """Drop cases (deleted or marked found) by moving the last live rows into their slots."""
+    try:
+        case_ids = [str(c) for c in case_ids]
+        if not case_ids or not exists(kind):
+            return
+        with _writing(kind):
+            matrix, ids, meta = _open_for_update(kind)
+            count = meta["count"]
+            holes = np.flatnonzero(np.isin(ids[:count], case_ids))
+            if len(holes) == 0:
+                return
+            new_count = count - len(holes)
+            # Live rows past the new end fill the holes that lie before it
+            movers = np.setdiff1d(np.arange(new_count, count), holes)
+            targets = holes[holes < new_count]
+            matrix[targets] = matrix[movers]
+            ids[targets] = ids[movers]
+            matrix.flush()
+            ids.flush()
+            _write_meta(kind, {"count": int(new_count), "generation": meta["generation"] + 1})
+    except Exception as e:
+        print(f"[SNAPSHOT ERROR] remove from {kind}: {e}")
+
+
+def reconcile(kind):
+    """
+    Bring the snapshot in line with the DB using only the case IDs, so rows
+    changed outside db_queries (scripts, manual edits) are picked up.
+    add/remove lock and re-read the files themselves, so a diff that is stale
+    by then only repeats work another process already did.
+    """
+    from pages.helper import db_queries
+
+    if kind == "registered":
+        db_ids = set(db_queries.fetch_registered_case_ids(status="NF"))
+    else:
+        db_ids = set(db_queries.fetch_public_case_ids(status="NF"))
+    snapshot_ids = set(view(kind).id_list())
+    if db_ids == snapshot_ids:
+        return False
+    remove(kind, snapshot_ids - db_ids)
+    missing = db_ids - snapshot_ids
+    if missing:
+        fetch = db_queries.fetch_registered_embeddings if kind == "registered" else db_queries.fetch_public_embeddings
+        add(kind, fetch(missing))
+    return True
+
+
+# -------------------- Loading --------------------
+def view(kind):
+    """
+    The snapshot as it is on disk now, with no export and no reconcile (safe
+    inside reading()). Files and meta are mapped under the shared lock, so
+    they belong to the same generation.
+    """
+    matrix_path, ids_path, _ = _paths(kind)
+    with locked(kind, shared=True):
+        meta = _read_meta(kind)
+        count = meta["count"]
+        matrix = np.load(matrix_path, mmap_mode="r")[:count]
+        ids = np.load(ids_path, mmap_mode="r")[:count]
+    return Snapshot(kind, ids, matrix, meta["generation"])
+
+
+def load(kind, refresh=True):
+    """
+    Memory-mapped view of the NF embeddings of `kind`. The snapshot is exported
+    on first use; with refresh=True it is reconciled with the DB IDs first.
+    A missing or corrupt snapshot is rebuilt from the DB.
+    """
+    try:
+        if not exists(kind):
+            export(kind)
+        elif refresh:
+            reconcile(kind)
+        return view(kind)
+    except Exception:
+        traceback.print_exc()
+    try:
+        export(kind)
+        return view(kind)
+    except Exception:
+        traceback.print_exc()
+        return _empty(kind)
+
+
+if __name__ == "__main__":
+    for kind in KINDS:
+        export(kind)
+    print(f"✅ Wrote embedding snapshots to {SNAPSHOT_DIR}/")
@@ -1,36 +1,148 @@
 import numpy as np
 import cv2
-from insightface.app import FaceAnalysis
 
-# Initialize InsightFace model
-model = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
-model.prepare(ctx_id=0, det_size=(640, 640))
+from pages.helper import inference_config
+from pages.helper.model_cache import get_face_analysis, get_face_mesh_pool
 
-def extract_embedding(image_np):
+# Aligned face crops per recognition forward pass
+REC_BATCH_SIZE = 32
+
+
+def extract_embedding(image_np, portrait: bool = False):
     """
-    Extract 512-d InsightFace embedding from a BGR/RGBA image.
+    Extract 512-d InsightFace embedding from an RGB (or RGBA / greyscale) image,
+    as decoded by PIL for uploads; the same path bulk_ingest uses.
+    With portrait=True detection runs at the smaller portrait_det_size
+    (inference_config), which is enough for already-cropped single-face photos.
     """
     try:
-        # 🟢 Ensure image is 3-channel RGB
-        if image_np.shape[2] == 4:  # RGBA image
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_BGRA2BGR)
-        elif image_np.shape[2] == 1:
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_GRAY2BGR)
-
-        # Detect face
-        faces = model.get(image_np)
+        if image_np.ndim == 3 and image_np.shape[2] == 1:
+            image_np = image_np[:, :, 0]
+
+        # Detect face (shared model, loaded on first use); only detection and
+        # recognition run, not the landmark/attribute models FaceAnalysis.get adds.
+        # extract_faces converts RGB / RGBA / greyscale to BGR for InsightFace
+        det_size = inference_config.get_config()["portrait_det_size"] if portrait else None
+        faces = extract_faces([image_np], det_size=det_size)[0]
+        if not faces and det_size:
+            # small faces in a wider shot: retry at the full detection size
+            faces = extract_faces([image_np])[0]
         if not faces:
             print("[WARN] No face detected.")
             return None
 
-        # Extract normalized embedding
-        embedding = faces[0].embedding
-        embedding = embedding / np.linalg.norm(embedding)
-        print("[DEBUG] Extracted embedding shape:", embedding.shape)
-        print("[DEBUG] First 5 values:", embedding[:5])
-
-        return embedding
+        # Normalized embedding of the most confident face
+        return faces[0]["embedding"]
 
     except Exception as e:
         print(f"[ERROR] extract_embedding failed: {e}")
         return None
+
+
+def extract_landmarks(image_np):
+    """
+    Extract MediaPipe face mesh landmarks from an RGB image as a float32
+    (478, 3) array of normalized x, y, z, or None if no face mesh is found.
+    """
+    try:
+        if image_np.ndim == 2:
+            image_np = cv2.cvtColor(image_np, cv2.COLOR_GRAY2RGB)
+        elif image_np.shape[2] == 4:
+            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
+
+        # Pooled FaceMesh graphs: no graph initialisation per image
+        results = get_face_mesh_pool().process(image_np)
+        if not results.multi_face_landmarks:
+            print("[WARN] No face mesh detected.")
+            return None
+
+        landmarks = results.multi_face_landmarks[0].landmark
+        return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+
+    except Exception as e:
+        print(f"[ERROR] extract_landmarks failed: {e}")
+        return None
+
+
+# ------------------ Batched multi-face extraction ------------------
+def _to_bgr(image_np, rgb=True):
+    if image_np.ndim == 2:
+        return cv2.cvtColor(image_np, cv2.COLOR_GRAY2BGR)
+    if image_np.shape[2] == 4:
+        return cv2.cvtColor(image_np, cv2.COLOR_RGBA2BGR if rgb else cv2.COLOR_BGRA2BGR)
+    return cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR) if rgb else image_np
+
+
+def _split_models(app):
+    """(detector, recognizer) of an InsightFace FaceAnalysis, or None for other models."""
+    models = getattr(app, "models", None)
+    if getattr(app, "det_model", None) is None or not models or "recognition" not in models:
+        return None
+    return app.det_model, models["recognition"]
+
+
+def extract_faces(images, min_score: float = 0.0, batch_size: int = REC_BATCH_SIZE,
+                  det_size=None, rgb: bool = True):
+    """
+    Detect every face in a list of RGB images (BGR with rgb=False) and embed them.
+
+    Returns one list per image of {"bbox", "det_score", "embedding"} dicts
+    (bbox as x1, y1, x2, y2; embedding L2-normalized float32), best detection
+    first. Detection runs per image (at `det_size` if given, else the configured
+    size); recognition runs on aligned crops from all images together,
+    `batch_size` crops per ONNX Runtime call.
+    """
+    app = get_face_analysis()
+    split = _split_models(app)
+    results = [[] for _ in images]
+
+    if split is None:
+        # Models without separate detector/recognizer: per-image get()
+        for i, image in enumerate(images):
+            for face in app.get(_to_bgr(image, rgb)):
+                if face.det_score >= min_score:
+                    results[i].append({
+                        "bbox": np.asarray(face.bbox, dtype=np.float32),
+                        "det_score": float(face.det_score),
+                        "embedding": np.asarray(face.embedding, dtype=np.float32),
+                    })
+    else:
+        from insightface.utils import face_align
+
+        detector, recognizer = split
+        crops, owners = [], []
+        for i, image in enumerate(images):
+            bgr = _to_bgr(image, rgb)
+            bboxes, kpss = detector.detect(
+                bgr, input_size=tuple(det_size) if det_size else None, max_num=0, metric="default"
+            )
+            for bbox, kps in zip(bboxes, kpss if kpss is not None else [None] * len(bboxes)):
+                if kps is None or bbox[4] < min_score:
+                    continue
+                crops.append(face_align.norm_crop(bgr, landmark=kps, image_size=recognizer.input_size[0]))
+                owners.append(i)
+                results[i].append({"bbox": bbox[:4].astype(np.float32), "det_score": float(bbox[4])})
+
+        # Batched recognition across every face of every image
+        embeddings = [recognizer.get_feat(crops[s:s + batch_size]) for s in range(0, len(crops), batch_size)]
+        embeddings = np.vstack(embeddings).astype(np.float32) if embeddings else np.empty((0, 512), np.float32)
+        positions = [0] * len(images)
+        for owner, embedding in zip(owners, embeddings):
+            results[owner][positions[owner]]["embedding"] = embedding
+            positions[owner] += 1
+
+    for faces in results:
+        for face in faces:
+            face["embedding"] = face["embedding"] / np.linalg.norm(face["embedding"])
+        faces.sort(key=lambda face: face["det_score"], reverse=True)
+    return results
+
+
+def crop_face(image_np, bbox, margin: float = 0.4):
+    """Crop a face with `margin` (fraction of its size) around the box, for a sighting photo."""
+    height, width = image_np.shape[:2]
+    x1, y1, x2, y2 = bbox
+    pad_x, pad_y = (x2 - x1) * margin, (y2 - y1) * margin
+    left, top = max(int(x1 - pad_x), 0), max(int(y1 - pad_y), 0)
+    right, bottom = min(int(x2 + pad_x), width), min(int(y2 + pad_y), height)
+    return image_np[top:bottom, left:right]
@@ -0,0 +1,213 @@
+import io
+import os
+import time
+import uuid
+import shutil
+import threading
+from functools import lru_cache
+
+import numpy as np
+import PIL.Image
+import PIL.ImageOps
+from PIL import features
+
+from pages.helper import db_queries
+from pages.helper.data_models import RegisteredCases, PublicSubmissions
+
+# ✅ Single place that knows how case photos are laid out on disk:
+#   resources/{id}.jpg          normalized original (RGB, EXIF-rotated, bounded size)
+#   resources/thumbs/{id}.webp  small thumbnail served to the listing pages
+RESOURCES_DIR = "./resources"
+THUMBS_DIR = os.path.join(RESOURCES_DIR, "thumbs")
+
+MAX_ORIGINAL_SIDE = 1600   # plenty for face detection (det_size is 640)
+ORIGINAL_QUALITY = 90
+THUMB_SIDE = 240           # listings show 80–120 px, 2x for high-DPI screens
+THUMB_QUALITY = 80
+THUMB_CACHE_SIZE = 512     # thumbnails kept in memory (~10 KB each)
+ORPHAN_MIN_AGE = 24 * 3600  # leave recent files alone: their case may still be being filled in
+
+THUMB_FORMAT, THUMB_EXT = ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+
+_write_lock = threading.Lock()
+
+
+# -------------------- Paths --------------------
+def original_path(case_id: str) -> str:
+    return os.path.join(RESOURCES_DIR, f"{case_id}.jpg")
+
+
+def thumbnail_path(case_id: str) -> str:
+    return os.path.join(THUMBS_DIR, f"{case_id}.{THUMB_EXT}")
+
+
+# -------------------- Writing --------------------
+def normalize(image: PIL.Image.Image) -> PIL.Image.Image:
+    """Apply EXIF rotation, drop alpha/palette and bound the longest side."""
+    image = PIL.ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((MAX_ORIGINAL_SIDE, MAX_ORIGINAL_SIDE), PIL.Image.LANCZOS)
+    return image
+
+
+def _atomic_save(image, path, **params):
+    tmp_path = f"{path}.tmp"
+    image.save(tmp_path, **params)
+    os.replace(tmp_path, path)
+
+
+def make_thumbnail(case_id: str, image: PIL.Image.Image = None) -> str:
+    """Write the thumbnail for a case from `image` (or its stored original)."""
+    if image is None:
+        with PIL.Image.open(original_path(case_id)) as original:
+            image = original.convert("RGB")
+    thumb = image.copy()
+    thumb.thumbnail((THUMB_SIDE, THUMB_SIDE), PIL.Image.LANCZOS)
+    os.makedirs(THUMBS_DIR, exist_ok=True)
+    path = thumbnail_path(case_id)
+    _atomic_save(thumb, path, format=THUMB_FORMAT, quality=THUMB_QUALITY)
+    return path
+
+
+def save_image(case_id: str, image: PIL.Image.Image) -> PIL.Image.Image:
+    """Store the normalized original and its thumbnail; returns the normalized image."""
+    image = normalize(image)
+    with _write_lock:
+        os.makedirs(RESOURCES_DIR, exist_ok=True)
+        _atomic_save(image, original_path(case_id), format="JPEG", quality=ORIGINAL_QUALITY)
+        make_thumbnail(case_id, image)
+    return image
+
+
+def load_upload(upload) -> PIL.Image.Image:
+    """Decode a Streamlit upload (file-like, bytes or path) into a normalized image."""
+    if isinstance(upload, bytes):
+        upload = io.BytesIO(upload)
+    with PIL.Image.open(upload) as image:
+        return normalize(image)
+
+
+def save_upload(case_id: str, upload) -> np.ndarray:
+    """
+    Save a Streamlit upload (file-like, bytes or path) for a case.
+    Returns the normalized RGB array so callers don't decode the file again.
+    """
+    return np.array(save_image(case_id, load_upload(upload)))
+
+
+def link_images(source_id: str, case_id: str) -> bool:
+    """
+    Reuse the stored files of `source_id` for `case_id` (hard link, copy as a
+    fallback) instead of re-encoding an identical photo. False if there is no source.
+    """
+    if not os.path.exists(original_path(source_id)):
+        return False
+    if source_id == case_id:
+        return True
+    if not os.path.exists(thumbnail_path(source_id)):
+        make_thumbnail(source_id)
+    with _write_lock:
+        os.makedirs(THUMBS_DIR, exist_ok=True)
+        for src, dst in ((original_path(source_id), original_path(case_id)),
+                         (thumbnail_path(source_id), thumbnail_path(case_id))):
+            if os.path.exists(dst):
+                os.remove(dst)
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copyfile(src, dst)
+    return True
+
+
+def delete_images(case_id: str) -> None:
+    for path in (original_path(case_id), thumbnail_path(case_id)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# -------------------- Reading --------------------
+@lru_cache(maxsize=THUMB_CACHE_SIZE)
+def _read_thumbnail(path: str, mtime: float) -> bytes:
+    # mtime is part of the key so a regenerated thumbnail is never served stale
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def thumbnail(case_id: str):
+    """
+    Encoded thumbnail bytes for a case (ready for st.image), or None if the
+    case has no photo. Missing thumbnails are generated from the original.
+    """
+    path = thumbnail_path(case_id)
+    if not os.path.exists(path):
+        if not os.path.exists(original_path(case_id)):
+            return None
+        try:
+            make_thumbnail(case_id)
+        except Exception as e:
+            print(f"[WARN] Could not create thumbnail for {case_id}: {e}")
+            return None
+    return _read_thumbnail(path, os.path.getmtime(path))
+
+
+def cache_info():
+    return _read_thumbnail.cache_info()
+
+
+# -------------------- Backfill --------------------
+def backfill(force: bool = False):
+    """Create thumbnails for originals that don't have one yet (all of them if force)."""
+    created, failed = 0, 0
+    for name in sorted(os.listdir(RESOURCES_DIR)):
+        case_id, ext = os.path.splitext(name)
+        if ext.lower() != ".jpg":
+            continue
+        if not force and os.path.exists(thumbnail_path(case_id)):
+            continue
+        try:
+            make_thumbnail(case_id)
+            created += 1
+        except Exception as e:
+            failed += 1
+            print(f"[WARN] Could not create thumbnail for {name}: {e}")
+    return {"created": created, "failed": failed}
+
+
+# -------------------- Orphan Cleanup --------------------
+def _is_case_id(name: str) -> bool:
+    try:
+        uuid.UUID(name)
+        return True
+    except ValueError:
+        return False
+
+
+def find_orphans(min_age: float = ORPHAN_MIN_AGE):
+    """
+    IDs of stored photos older than `min_age` seconds that belong to no
+    registered case or sighting (uploads abandoned before the form was saved).
+    Only UUID-named files are considered, so other assets in resources/ stay.
+    """
+    cutoff = time.time() - min_age
+    candidates = set()
+    for directory in (RESOURCES_DIR, THUMBS_DIR):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            case_id, ext = os.path.splitext(name)
+            path = os.path.join(directory, name)
+            if ext.lower() in (".jpg", f".{THUMB_EXT}") and _is_case_id(case_id) and os.path.getmtime(path) < cutoff:
+                candidates.add(case_id)
+    if not candidates:
+        return []
+    known = db_queries.existing_case_ids(RegisteredCases, candidates)
+    known |= db_queries.existing_case_ids(PublicSubmissions, candidates)
+    return sorted(candidates - known)
+
+
+def collect_orphans(min_age: float = ORPHAN_MIN_AGE, dry_run: bool = False):
+    """Delete (or just list, with dry_run) orphaned photos; returns their IDs."""
+    orphans = find_orphans(min_age)
+    if not dry_run:
+        for case_id in orphans:
+            delete_images(case_id)
+    return orphans
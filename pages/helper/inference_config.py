@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import platform
+import threading
+
+import numpy as np
+import yaml
+
+# ✅ Single place for InsightFace / ONNX Runtime settings.
+# Precedence: DEFAULTS < inference_config.yml < SVR_INFER_* environment variables,
+# e.g. SVR_INFER_INTRA_OP_THREADS=8 or SVR_INFER_DET_SIZE=480,480.
+CONFIG_PATH = os.environ.get("SVR_INFERENCE_CONFIG", "inference_config.yml")
+TUNING_PATH = "inference_tuning.json"
+ENV_PREFIX = "SVR_INFER_"
+
+DEFAULTS = {
+    "model_name": "buffalo_l",
+    "providers": ["CPUExecutionProvider"],
+    "det_size": [640, 640],              # scenes, group photos, CCTV frames
+    "portrait_det_size": [320, 320],     # already-cropped single-face photos
+    "modules": ["detection", "recognition"],   # skip landmark/gender-age models
+    "intra_op_threads": 0,               # 0 = onnxruntime default
+    "inter_op_threads": 0,
+    "execution_mode": "sequential",      # or "parallel"
+    "graph_optimization": "all",         # all | extended | basic | disable
+    "autotune": False,                   # benchmark thread settings once per host
+}
+
+_config = None
+_lock = threading.Lock()
+
+
+# -------------------- Loading --------------------
+def _parse_env(value, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, list):
+        items = [item.strip() for item in value.split(",") if item.strip()]
+        return [int(item) for item in items] if default and isinstance(default[0], int) else items
+    return value
+
+
+def load_config(path: str = CONFIG_PATH) -> dict:
+    """Build the inference settings from defaults, the YAML file and the environment."""
+    config = dict(DEFAULTS)
+    if os.path.isfile(path):
+        with open(path) as f:
+            overrides = yaml.safe_load(f) or {}
+        unknown = set(overrides) - set(DEFAULTS)
+        if unknown:
+            print(f"[WARN] Unknown inference settings ignored: {sorted(unknown)}")
+        config.update({k: v for k, v in overrides.items() if k in DEFAULTS})
+    for key, default in DEFAULTS.items():
+        value = os.environ.get(ENV_PREFIX + key.upper())
+        if value is not None:
+            config[key] = _parse_env(value, default)
+    return config
+
+
+def get_config() -> dict:
+    """Process-wide settings (loaded once); includes autotuned threads when enabled."""
+    global _config
+    with _lock:
+        if _config is None:
+            _config = load_config()
+            if _config["autotune"]:
+                _config.update(load_tuning(_config) or {})
+        return dict(_config)
+
+
+def reset():
+    global _config
+    with _lock:
+        _config = None
+
+
+# -------------------- ONNX Runtime --------------------
+def session_options(config: dict):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(config["intra_op_threads"])
+    options.inter_op_num_threads = int(config["inter_op_threads"])
+    options.execution_mode = (
+        ort.ExecutionMode.ORT_PARALLEL
+        if config["execution_mode"] == "parallel"
+        else ort.ExecutionMode.ORT_SEQUENTIAL
+    )
+    options.graph_optimization_level = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[config["graph_optimization"]]
+    return options
+
+
+def apply_session_options(app, config: dict):
+    """
+    Recreate the ONNX Runtime session of every model in a FaceAnalysis with
+    our SessionOptions (insightface only forwards providers when it loads them).
+    """
+    import onnxruntime as ort
+
+    options = session_options(config)
+    for model in app.models.values():
+        model.session = ort.InferenceSession(
+            model.model_file, sess_options=options, providers=list(config["providers"])
+        )
+    return app
+
+
+# -------------------- Self-benchmark --------------------
+def host_key(config: dict) -> str:
+    try:
+        import onnxruntime as ort
+
+        ort_version = ort.__version__
+    except ImportError:
+        ort_version = None
+    return f"{platform.node()}|{os.cpu_count()}|{config['model_name']}|{','.join(config['providers'])}|{ort_version}"
+
+
+def candidate_settings(cores: int = None):
+    """Thread layouts worth trying on a host with `cores` logical CPUs."""
+    cores = cores or os.cpu_count() or 1
+    intra_options = sorted({cores, max(cores // 2, 1), max(cores // 4, 1), 1}, reverse=True)
+    candidates = [
+        {"intra_op_threads": intra, "inter_op_threads": 1, "execution_mode": "sequential"}
+        for intra in intra_options
+    ]
+    if cores >= 4:
+        candidates.append(
+            {"intra_op_threads": cores // 2, "inter_op_threads": 2, "execution_mode": "parallel"}
+        )
+    return candidates
+
+
+def _time_session(session, shape, runs):
+    feed = {session.get_inputs()[0].name: np.random.rand(*shape).astype(np.float32)}
+    session.run(None, feed)  # warm-up
+    start = time.perf_counter()
+    for _ in range(runs):
+        session.run(None, feed)
+    return (time.perf_counter() - start) / runs
+
+
+def autotune(model_files: dict, config: dict, runs: int = 5, rec_batch: int = 8):
+    """
+    Time the detection and recognition models under each candidate thread
+    layout and return (best_settings, results). `model_files` maps
+    "detection"/"recognition" to their .onnx paths.
+    """
+    import onnxruntime as ort
+
+    det_height, det_width = config["det_size"][1], config["det_size"][0]
+    results = []
+    for candidate in candidate_settings():
+        options = session_options({**config, **candidate})
+        seconds = 0.0
+        if "detection" in model_files:
+            session = ort.InferenceSession(model_files["detection"], sess_options=options, providers=list(config["providers"]))
+            seconds += _time_session(session, (1, 3, det_height, det_width), runs)
+        if "recognition" in model_files:
+            session = ort.InferenceSession(model_files["recognition"], sess_options=options, providers=list(config["providers"]))
+            seconds += _time_session(session, (rec_batch, 3, 112, 112), runs) / rec_batch
+        results.append({**candidate, "seconds": round(seconds, 4)})
+        print(f"[TUNE] {candidate} → {seconds * 1000:.1f} ms per image")
+    best = min(results, key=lambda r: r["seconds"])
+    return {k: v for k, v in best.items() if k != "seconds"}, results
+
+
+def load_tuning(config: dict, path: str = TUNING_PATH):
+    """Tuned thread settings recorded for this host, or None."""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f).get(host_key(config))
+    except (OSError, ValueError):
+        return None
+
+
+def save_tuning(config: dict, settings: dict, path: str = TUNING_PATH):
+    data = {}
+    if os.path.isfile(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+    data[host_key(config)] = settings
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def tune_face_analysis(app, config: dict, runs: int = 5):
+    """Benchmark a loaded FaceAnalysis's models, store the winner for this host and return it."""
+    model_files = {kind: model.model_file for kind, model in app.models.items() if kind in ("detection", "recognition")}
+    best, results = autotune(model_files, config, runs=runs)
+    save_tuning(config, best)
+    with _lock:
+        if _config is not None:
+            _config.update(best)
+    return best, results
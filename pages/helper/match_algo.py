@@ -1,17 +1,22 @@
-import json
+import os
+import contextlib
 import traceback
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from scipy.spatial.distance import cosine
-from pages.helper import db_queries
+from pages.helper import db_queries, embedding_snapshot, match_filters, quantization
+from pages.helper.match_state import MatchState
+from pages.helper.data_models import PublicSubmissions
+from pages.helper.embedding_codec import decode_embedding, normalize_rows
 
 
 def cosine_similarity(emb1, emb2):
     """Compute cosine similarity between two embeddings."""
     if emb1 is None or emb2 is None:
         return 0.0
-    return 1 - cosine(emb1, emb2)
+    return float(1 - cosine(np.asarray(emb1, dtype=np.float64), np.asarray(emb2, dtype=np.float64)))
 
 
 def get_registered_cases_data(status="NF"):
@@ -19,9 +24,7 @@ def get_registered_cases_data(status="NF"):
     try:
         result = db_queries.fetch_registered_cases(train_data=True, status=status)
         df = pd.DataFrame(result, columns=["id", "embedding"])
-        df["embedding"] = df["embedding"].apply(
-            lambda x: np.array(json.loads(x)) if x else None
-        )
+        df["embedding"] = [decode_embedding(x) for x in df["embedding"]]
         df = df.dropna(subset=["embedding"])
         return df
     except Exception:
@@ -34,9 +37,7 @@ def get_public_cases_data(status="NF"):
     try:
         result = db_queries.fetch_public_cases(train_data=True, status=status)
         df = pd.DataFrame(result, columns=["id", "embedding"])
-        df["embedding"] = df["embedding"].apply(
-            lambda x: np.array(json.loads(x)) if x else None
-        )
+        df["embedding"] = [decode_embedding(x) for x in df["embedding"]]
         df = df.dropna(subset=["embedding"])
         return df
     except Exception:
@@ -44,47 +45,562 @@ def get_public_cases_data(status="NF"):
         return None
 
 
-def match(threshold=0.35):
+def load_snapshots():
     """
-    Match embeddings between registered and public cases using cosine similarity.
-    Higher similarity → more likely match.
+    Memory-mapped (registered, public) NF embedding snapshots: L2-normalised
+    float32 matrices shared between processes, with no per-row decoding.
     """
-    matched_cases = defaultdict(list)
+    return embedding_snapshot.load("registered"), embedding_snapshot.load("public")
+
+
+def with_snapshots(score, kinds=embedding_snapshot.KINDS):
+    """
+    score(*snapshots) on the current snapshots of `kinds`. Removals move rows
+    in place, so if a writer changed a snapshot meanwhile (its generation
+    moved) the pass is run again while holding the shared snapshot locks,
+    so writers wait for it instead.
+    """
+    snapshots = [embedding_snapshot.load(kind) for kind in kinds]
+    result = score(*snapshots)
+    if all(snapshot.is_current() for snapshot in snapshots):
+        return result
+    print("[WARN] Embedding snapshot changed during matching, re-running")
+    with embedding_snapshot.reading(*kinds):
+        return score(*[embedding_snapshot.view(kind) for kind in kinds])
+
+
+def stack_embeddings(embeddings):
+    """Stack a sequence of embeddings into a contiguous, L2-normalised float32 matrix."""
+    return normalize_rows(np.vstack(list(embeddings)))
+
+
+def _top_k_rows(sims, k):
+    """Column indices of the k largest values per row, best first (partial sort)."""
+    if k >= sims.shape[1]:
+        return np.argsort(-sims, axis=1, kind="stable")
+    idx = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(sims, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def _merge_top_k(top_idx, top_sims, idx, sims, k):
+    """Merge candidate (idx, sims) columns into a running per-row top-k, best first."""
+    merged_idx = np.hstack([top_idx, idx])
+    merged_sims = np.hstack([top_sims, sims])
+    keep = _top_k_rows(merged_sims, min(k, merged_idx.shape[1]))
+    return np.take_along_axis(merged_idx, keep, axis=1), np.take_along_axis(merged_sims, keep, axis=1)
+
+
+def best_matches(public_matrix, registered_matrix, block_size=1024, rescore=3):
+    """
+    Return (best_index, best_similarity) for every public row.
+    Similarities are computed block by block as one matrix product, so memory
+    stays at block_size x n_registered regardless of the public set size.
+    The top `rescore` float32 candidates per row are then re-scored in float64
+    and the best of those wins, so near-ties are decided on exact cosines;
+    best_similarity is that float64 cosine.
+    best_index is -1 when no registered case scores above 0.0.
+    """
+    n_public, n_registered = public_matrix.shape[0], registered_matrix.shape[0]
+    best_index = np.full(n_public, -1, dtype=np.int64)
+    best_similarity = np.zeros(n_public, dtype=np.float64)
+    if not n_registered:
+        return best_index, best_similarity
+    rescore = max(min(rescore, n_registered), 1)
+
+    # A transposed view, not a copy: BLAS reads it in place (it may be an mmap)
+    registered_t = registered_matrix.T
+    for start in range(0, n_public, block_size):
+        stop = min(start + block_size, n_public)
+        block = public_matrix[start:stop]
+        candidates = _top_k_rows(block @ registered_t, rescore)
+
+        # Only the shortlisted rows are gathered and scored in float64
+        rows, inverse = np.unique(candidates, return_inverse=True)
+        shortlist = normalize_rows(registered_matrix[rows], np.float64)[inverse.reshape(candidates.shape)]
+        exact = np.einsum("qd,qcd->qc", normalize_rows(block, np.float64), shortlist)
+        # argmax keeps the first maximum, i.e. the float32 order on exact ties
+        pick = exact.argmax(axis=1)
+        rows_in_block = np.arange(stop - start)
+        top = exact[rows_in_block, pick]
+        positive = top > 0.0
+        best_index[start:stop] = np.where(positive, candidates[rows_in_block, pick], -1)
+        best_similarity[start:stop] = np.where(positive, top, 0.0)
+
+    return best_index, best_similarity
+
+
+def top_k_matches(public_matrix, registered_matrix, k=5, block_size=1024):
+    """
+    Top-k registered cases for every sighting and top-k sightings for every case,
+    from one pass of blocked similarity products.
+    Returns (pub_idx, pub_sims, reg_idx, reg_sims): arrays of shape (n_public, k')
+    and (n_registered, k'') holding column indices and similarities, best first.
+    """
+    n_public, n_registered = public_matrix.shape[0], registered_matrix.shape[0]
+    k_pub, k_reg = min(k, n_registered), min(k, n_public)
+    pub_idx = np.empty((n_public, k_pub), dtype=np.int64)
+    pub_sims = np.empty((n_public, k_pub), dtype=np.float32)
+    reg_idx = np.empty((n_registered, 0), dtype=np.int64)
+    reg_sims = np.empty((n_registered, 0), dtype=np.float32)
+
+    registered_t = registered_matrix.T
+    for start in range(0, n_public, block_size):
+        stop = min(start + block_size, n_public)
+        sims = public_matrix[start:stop] @ registered_t
+
+        idx = _top_k_rows(sims, k_pub)
+        pub_idx[start:stop] = idx
+        pub_sims[start:stop] = np.take_along_axis(sims, idx, axis=1)
+
+        # Merge this block's best sightings per case into the running top-k
+        block_t = sims.T
+        idx = _top_k_rows(block_t, min(k_reg, stop - start))
+        reg_idx, reg_sims = _merge_top_k(reg_idx, reg_sims, idx + start, np.take_along_axis(block_t, idx, axis=1), k_reg)
+
+    return pub_idx, pub_sims, reg_idx, reg_sims
+
 
-    registered_df = get_registered_cases_data(status="NF")
-    public_df = get_public_cases_data(status="NF")
+def block_rows(query_rows, dim=512, memory_mb=256):
+    """
+    Registered rows per similarity block so that the block's vectors plus the
+    (query_rows x block) float32 similarity matrix fit in `memory_mb`.
+    """
+    return max(int(memory_mb * 2**20 // (4 * (query_rows + dim))), 1)
+
+
+def _chunk_top_k(public_matrix, registered_matrix, k, memory_mb):
+    """Top-k registered rows for one chunk of sightings, scored block by block."""
+    n_registered = len(registered_matrix)
+    top_idx = np.empty((len(public_matrix), 0), dtype=np.int64)
+    top_sims = np.empty((len(public_matrix), 0), dtype=np.float32)
+    step = block_rows(len(public_matrix), registered_matrix.shape[1], memory_mb)
+    for start in range(0, n_registered, step):
+        stop = min(start + step, n_registered)
+        sims = public_matrix @ registered_matrix[start:stop].T
+        idx = _top_k_rows(sims, min(k, stop - start))
+        # Merge this block's best rows into the running top-k
+        top_idx, top_sims = _merge_top_k(top_idx, top_sims, idx + start, np.take_along_axis(sims, idx, axis=1), k)
+    return top_idx, top_sims
+
+
+def match_stream(threshold=0.35, k=1, chunk_size=1000, memory_mb=256):
+    """
+    Generator version of a full exact match with bounded memory. Sightings are
+    streamed from the DB `chunk_size` rows at a time; each chunk is scored
+    against the registered snapshot block by block (sized by memory_mb) while
+    a running top-k per sighting is kept. As soon as a chunk is done, yields the
+    list of (public_id, [(registered_id, similarity), ...]) for its sightings
+    with a candidate above the threshold, so callers can show results early
+    and look up their details one chunk at a time.
+    """
+    registered = embedding_snapshot.load("registered")
+    if not len(registered):
+        return
+    registered_ids = registered.id_list()
+
+    for rows in db_queries.iter_embeddings(PublicSubmissions, status="NF", chunk_size=chunk_size):
+        decoded = [(pub_id, decode_embedding(emb)) for pub_id, emb in rows]
+        decoded = [(pub_id, emb) for pub_id, emb in decoded if emb is not None]
+        if not decoded:
+            continue
+        public_ids = [pub_id for pub_id, _ in decoded]
+        public_matrix = stack_embeddings(emb for _, emb in decoded)
+
+        top_idx, top_sims = _chunk_top_k(public_matrix, registered.matrix, k, memory_mb)
+        if not registered.is_current():
+            # Rows moved under this chunk: score it again with writers held off
+            with embedding_snapshot.reading("registered"):
+                registered = embedding_snapshot.view("registered")
+                registered_ids = registered.id_list()
+                if not len(registered):
+                    return
+                top_idx, top_sims = _chunk_top_k(public_matrix, registered.matrix, k, memory_mb)
+
+        matched = []
+        for i, pub_id in enumerate(public_ids):
+            ranked = [(registered_ids[j], float(s)) for j, s in zip(top_idx[i], top_sims[i]) if s >= threshold]
+            if ranked:
+                matched.append((pub_id, ranked))
+        if matched:
+            yield matched
+
+
+def match_top_k(threshold=0.35, k=5):
+    """
+    Ranked candidates instead of a single best match:
+    "by_sighting" maps each public case to its top-k registered cases and
+    "by_case" maps each registered case to its top-k sightings, as
+    (id, similarity) lists above the threshold, best first.
+    """
+    def score(registered, public):
+        if not len(registered) or not len(public):
+            return None
+        return (registered.id_list(), public.id_list(), *top_k_matches(public.matrix, registered.matrix, k=k))
 
-    if registered_df is None or public_df is None:
+    scored = with_snapshots(score)
+    if scored is None:
+        return {"status": False, "message": "No data available"}
+    registered_ids, public_ids, pub_idx, pub_sims, reg_idx, reg_sims = scored
+
+    by_sighting, by_case = {}, {}
+    for i, pub_id in enumerate(public_ids):
+        ranked = [(registered_ids[j], float(s)) for j, s in zip(pub_idx[i], pub_sims[i]) if s >= threshold]
+        if ranked:
+            by_sighting[pub_id] = ranked
+    for i, reg_id in enumerate(registered_ids):
+        ranked = [(public_ids[j], float(s)) for j, s in zip(reg_idx[i], reg_sims[i]) if s >= threshold]
+        if ranked:
+            by_case[reg_id] = ranked
+
+    return {"status": True, "by_sighting": by_sighting, "by_case": by_case}
+
+
+def match_incremental(threshold=0.35, blas_threads=1):
+    """
+    Only score what changed since the last run, exactly:
+    (new sightings × all cases) ∪ (all sightings × new cases).
+    Best matches are cached in match_state.json; deleting a case or marking it
+    found re-scores only the sightings that pointed at it. Only cases and
+    sightings that are NF in the DB at the time of the run take part, and the
+    result is checked against the DB once more before it is returned.
+    `blas_threads` caps the BLAS threads used for scoring (needs threadpoolctl).
+    """
+    def score(registered, public):
+        state = MatchState.load()
+        registered_ids, registered_matrix = registered.take(db_queries.fetch_registered_case_ids(status="NF"))
+        public_ids, public_matrix = public.take(db_queries.fetch_public_case_ids(status="NF"))
+        new_registered, rescore_public = state.diff(registered_ids, public_ids)
+
+        with _blas_threads(blas_threads):
+            # New / invalidated sightings against every open case
+            rescore_rows = [i for i, pub_id in enumerate(public_ids) if pub_id in rescore_public]
+            if rescore_rows:
+                best_index, best_similarity = best_matches(public_matrix[rescore_rows], registered_matrix)
+                for row, i, sim in zip(rescore_rows, best_index, best_similarity):
+                    state.best[public_ids[row]] = [registered_ids[i], float(sim)] if i >= 0 else [None, 0.0]
+
+            # Previously scored sightings against only the new cases
+            old_rows = [i for i, pub_id in enumerate(public_ids) if pub_id not in rescore_public]
+            new_rows = [i for i, reg_id in enumerate(registered_ids) if reg_id in new_registered]
+            if old_rows and new_rows:
+                best_index, best_similarity = best_matches(public_matrix[old_rows], registered_matrix[new_rows])
+                for row, i, sim in zip(old_rows, best_index, best_similarity):
+                    pub_id = public_ids[row]
+                    if i >= 0 and sim > state.best.get(pub_id, [None, 0.0])[1]:
+                        state.best[pub_id] = [registered_ids[new_rows[i]], float(sim)]
+        return state, public_ids, len(rescore_rows), len(new_rows)
+
+    try:
+        state, public_now, n_rescored, n_new_registered = with_snapshots(score)
+        state.generation += 1
+        state.save()
+
+        # A case or sighting closed while this pass ran is dropped here; the
+        # state catches up on the next run
+        registered_open = set(db_queries.fetch_registered_case_ids(status="NF"))
+        public_open = set(db_queries.fetch_public_case_ids(status="NF"))
+    except Exception:
+        traceback.print_exc()
         return {"status": False, "message": "Database fetch failed"}
-    if registered_df.empty or public_df.empty:
+
+    if not state.best or not state.registered:
         return {"status": False, "message": "No data available"}
 
-    # Compare every public case with each registered case
-    for _, pub_row in public_df.iterrows():
-        pub_id = pub_row["id"]
-        pub_emb = pub_row["embedding"]
+    matched_cases = defaultdict(list)
+    scores = {}
+    for pub_id in public_now:  # snapshot order, same as a full match
+        reg_id, sim = state.best.get(pub_id, (None, 0.0))
+        if reg_id in registered_open and pub_id in public_open and sim >= threshold:
+            matched_cases[reg_id].append(pub_id)
+            scores[(reg_id, pub_id)] = sim
+    print(
+        f"[INCREMENTAL] scored {n_rescored} new sightings, {n_new_registered} new cases, "
+        f"{len(scores)} matches"
+    )
+    return {"status": True, "result": matched_cases, "scores": scores}
+
+
+# -------------------- Filtered Matching --------------------
+def match_filtered(threshold=0.35, rules=None):
+    """
+    Exact match where each sighting is only compared with the registered cases
+    that pass the metadata rules (region, registration date, age band; see
+    match_filters). Sightings sharing the same metadata share one candidate
+    query. The result includes "pruning_ratio": the share of case × sighting
+    pairs that were never scored.
+    """
+    rules = rules or match_filters.get_rules()
+
+    def score(registered, public):
+        if not len(registered) or not len(public):
+            return None
+        registered_ids = registered.id_list()
+        registered_rows = {case_id: row for row, case_id in enumerate(registered_ids)}
+        public_rows = {case_id: row for row, case_id in enumerate(public.id_list())}
+
+        blocks = defaultdict(list)
+        for pub_id, region, submitted_on, approx_age in db_queries.fetch_public_filter_fields():
+            if pub_id in public_rows:
+                blocks[match_filters.block_key(rules, region, submitted_on, approx_age)].append(pub_id)
+
+        matched_cases = defaultdict(list)
+        scores = {}
+        compared = 0
+        for key, pub_ids in blocks.items():
+            candidate_ids = db_queries.filtered_registered_case_ids(**match_filters.candidate_query(rules, key))
+            candidates = np.array(
+                sorted(registered_rows[c] for c in candidate_ids if c in registered_rows), dtype=np.int64
+            )
+            if not len(candidates):
+                continue
+            compared += len(pub_ids) * len(candidates)
+            best_index, best_similarity = best_matches(
+                public.matrix[[public_rows[p] for p in pub_ids]], registered.matrix[candidates]
+            )
+            for i, pub_id in enumerate(pub_ids):
+                if best_index[i] >= 0 and best_similarity[i] >= threshold:
+                    best_match_id = registered_ids[candidates[best_index[i]]]
+                    matched_cases[best_match_id].append(pub_id)
+                    scores[(best_match_id, pub_id)] = float(best_similarity[i])
+        return matched_cases, scores, compared, len(blocks), len(registered) * len(public)
+
+    scored = with_snapshots(score)
+    if scored is None:
+        return {"status": False, "message": "No data available"}
+    matched_cases, scores, compared, n_blocks, total = scored
+    pruning_ratio = 1.0 - compared / total
+    print(
+        f"[FILTER] {n_blocks} candidate blocks, scored {compared} of {total} pairs "
+        f"(pruned {pruning_ratio:.1%}), {len(scores)} matches"
+    )
+    return {
+        "status": True,
+        "result": matched_cases,
+        "scores": scores,
+        "pruning_ratio": pruning_ratio,
+        "compared_pairs": compared,
+    }
+
+
+# -------------------- Quantized Matching --------------------
+def quantized_top_k(quantizer, codes, exact_matrix, queries, k=1, rerank=10, block_size=16_384, query_block=1024):
+    """
+    Two-pass top-k: every code block is scored with the quantizer and the best
+    `rerank` rows per query are kept, then only those rows are re-scored with
+    the exact float32 vectors. Returns (idx, sims) of shape (n_queries, k'),
+    best first, with exact similarities.
+    """
+    n = len(codes)
+    rerank = min(max(rerank, k), n)
+    k = min(k, n)
+    out_idx = np.empty((len(queries), k), dtype=np.int64)
+    out_sims = np.empty((len(queries), k), dtype=np.float32)
 
-        best_match_id = None
-        best_similarity = 0.0
+    for q_start in range(0, len(queries), query_block):
+        q_stop = min(q_start + query_block, len(queries))
+        query = np.asarray(queries[q_start:q_stop], dtype=np.float32)
+        cand_idx = np.empty((len(query), 0), dtype=np.int64)
+        cand_sims = np.empty((len(query), 0), dtype=np.float32)
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            sims = quantizer.scores(query, codes[start:stop])
+            idx = _top_k_rows(sims, min(rerank, stop - start))
+            cand_idx, cand_sims = _merge_top_k(
+                cand_idx, cand_sims, idx + start, np.take_along_axis(sims, idx, axis=1), rerank
+            )
 
-        for _, reg_row in registered_df.iterrows():
-            reg_id = reg_row["id"]
-            reg_emb = reg_row["embedding"]
+        # Re-rank: gather only the candidate rows (pages of an mmap stay on disk otherwise)
+        rows, inverse = np.unique(cand_idx, return_inverse=True)
+        exact = np.einsum("qd,qcd->qc", query, np.asarray(exact_matrix[rows])[inverse.reshape(cand_idx.shape)])
+        top = _top_k_rows(exact, k)
+        out_idx[q_start:q_stop] = np.take_along_axis(cand_idx, top, axis=1)
+        out_sims[q_start:q_stop] = np.take_along_axis(exact, top, axis=1)
+    return out_idx, out_sims
+
+
+def match_quantized(threshold=0.35, method="int8", rerank=10):
+    """
+    Best match per sighting from a first pass over compact registered codes
+    (float16, int8 or pq<m>; see quantization) re-ranked with exact vectors.
+    Similarities in the result are exact; a true best match can only be missed
+    if it falls outside the top `rerank` by the approximate score. This saves
+    memory read per pass, not time: it is not faster than match().
+    """
+    def score(registered, public):
+        if not len(registered) or not len(public):
+            return None
+        quantizer, codes = quantization.load_codes(registered, method)
+        idx, sims = quantized_top_k(quantizer, codes, registered.matrix, public.matrix, k=1, rerank=rerank)
+        return registered.id_list(), public.id_list(), idx, sims
+
+    scored = with_snapshots(score)
+    if scored is None:
+        return {"status": False, "message": "No data available"}
+    registered_ids, public_ids, idx, sims = scored
+
+    matched_cases = defaultdict(list)
+    scores = {}
+    for i, pub_id in enumerate(public_ids):
+        if sims[i, 0] >= threshold:
+            best_match_id = registered_ids[idx[i, 0]]
+            matched_cases[best_match_id].append(pub_id)
+            scores[(best_match_id, pub_id)] = float(sims[i, 0])
+    print(f"[QUANTIZED] {method}, rerank {rerank}: {len(scores)} matches")
+    return {"status": True, "result": matched_cases, "scores": scores}
+
+
+# -------------------- Sharded Matching --------------------
+_threadpoolctl_warned = False
+
+
+def _blas_threads(threads):
+    """Cap BLAS threads inside a shard worker so N processes don't oversubscribe the cores."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        global _threadpoolctl_warned
+        if not _threadpoolctl_warned:
+            print("[WARN] threadpoolctl is not installed; BLAS thread cap ignored (pip install threadpoolctl)")
+            _threadpoolctl_warned = True
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=threads, user_api="blas")
 
-            sim = cosine_similarity(pub_emb, reg_emb)
 
-            if sim > best_similarity:
-                best_similarity = sim
-                best_match_id = reg_id
+def _score_shard(task):
+    """
+    Worker: top-k rows of one registered shard for every sighting. Both
+    matrices are mapped from the snapshot files, so nothing is pickled across
+    but the slice bounds and the (n_public, k) results.
+    """
+    registered_path, public_path, start, stop, n_public, k, block_size, threads = task
+    registered = np.load(registered_path, mmap_mode="r")[start:stop]
+    public = np.load(public_path, mmap_mode="r")[:n_public]
+    k = min(k, stop - start)
+    idx = np.empty((n_public, k), dtype=np.int64)
+    sims = np.empty((n_public, k), dtype=np.float32)
+    with _blas_threads(threads):
+        for block in range(0, n_public, block_size):
+            block_stop = min(block + block_size, n_public)
+            block_sims = public[block:block_stop] @ registered.T
+            top = _top_k_rows(block_sims, k)
+            idx[block:block_stop] = top + start
+            sims[block:block_stop] = np.take_along_axis(block_sims, top, axis=1)
+    return idx, sims
+
+
+def sharded_top_k(registered, public, k=1, shards=None, workers=None, block_size=1024):
+    """
+    Exact top-k registered rows per sighting, with the registered snapshot split
+    into `shards` contiguous row ranges scored by `workers` processes.
+    Returns (idx, sims) of shape (n_public, k'), best first.
+    """
+    workers = max(workers or os.cpu_count() or 1, 1)
+    shards = min(max(shards or workers, 1), len(registered))
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    bounds = np.linspace(0, len(registered), shards + 1).astype(np.int64)
+    tasks = [
+        (embedding_snapshot.matrix_path("registered"), embedding_snapshot.matrix_path("public"),
+         int(start), int(stop), len(public), k, block_size, threads)
+        for start, stop in zip(bounds[:-1], bounds[1:])
+        if stop > start
+    ]
+    if workers == 1:
+        parts = [_score_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            parts = list(pool.map(_score_shard, tasks))
+
+    # Merge the per-shard candidates into the global top-k
+    idx = np.empty((len(public), 0), dtype=np.int64)
+    sims = np.empty((len(public), 0), dtype=np.float32)
+    for part_idx, part_sims in parts:
+        idx, sims = _merge_top_k(idx, sims, part_idx, part_sims, k)
+    return idx, sims
+
+
+def match_sharded(threshold=0.35, shards=None, workers=None, k=1):
+    """
+    Full exact match spread over processes, for very large sweeps. Each
+    process maps the snapshot files and scores one shard of registered cases;
+    per-shard top-k lists are merged. Returns the same result/scores as match()
+    plus "by_sighting": ranked (registered_id, similarity) lists above the threshold.
+    """
+    def score(registered, public):
+        if not len(registered) or not len(public):
+            return None
+        idx, sims = sharded_top_k(registered, public, k=k, shards=shards, workers=workers)
+        return registered.id_list(), public.id_list(), idx, sims
+
+    scored = with_snapshots(score)
+    if scored is None:
+        return {"status": False, "message": "No data available"}
+    registered_ids, public_ids, idx, sims = scored
+
+    matched_cases = defaultdict(list)
+    scores, by_sighting = {}, {}
+    for i, pub_id in enumerate(public_ids):
+        ranked = [(registered_ids[j], float(s)) for j, s in zip(idx[i], sims[i]) if s >= threshold]
+        if ranked:
+            best_match_id, sim = ranked[0]
+            matched_cases[best_match_id].append(pub_id)
+            scores[(best_match_id, pub_id)] = sim
+            by_sighting[pub_id] = ranked
+    print(f"[SHARDED] {len(registered_ids)} cases × {len(public_ids)} sightings → {len(scores)} matches")
+    return {"status": True, "result": matched_cases, "scores": scores, "by_sighting": by_sighting}
+
+
+def match(threshold=0.35, incremental=False, blas_threads=1, processes=0, shards=None, filters=False,
+          quantization_method=None, rerank=10, verbose=True):
+    """
+    Match embeddings between registered and public cases using cosine similarity.
+    Higher similarity → more likely match.
+    By default every pair is scored exactly (brute force).
+    With incremental=True only cases/sightings changed since the last run are scored.
+    With processes > 1 every pair is scored exactly, sharded across processes.
+    With filters=True (or a rules dict) sightings are only scored against
+    cases that pass the match_filters metadata rules.
+    With quantization_method ("float16", "int8", "pq32", ...) candidates come
+    from compact codes and the top `rerank` are re-scored exactly.
+    With verbose=False the exact scan does not print a line per sighting.
+    """
+    if incremental:
+        return match_incremental(threshold, blas_threads=blas_threads)
+    if filters:
+        return match_filtered(threshold, rules=filters if isinstance(filters, dict) else None)
+    if quantization_method:
+        return match_quantized(threshold, method=quantization_method, rerank=rerank)
+    if processes > 1:
+        return match_sharded(threshold, shards=shards, workers=processes)
+
+    def score(registered, public):
+        if not len(registered) or not len(public):
+            return None
+        return (registered.id_list(), public.id_list(), *best_matches(public.matrix, registered.matrix))
+
+    scored = with_snapshots(score)
+    if scored is None:
+        return {"status": False, "message": "No data available"}
+    registered_ids, public_ids, best_index, best_similarity = scored
+
+    matched_cases = defaultdict(list)
+    scores = {}
+
+    for i, pub_id in enumerate(public_ids):
+        best_match_id = registered_ids[best_index[i]] if best_index[i] >= 0 else None
+        # Already a float64 cosine, so the threshold check is exact
+        sim = float(best_similarity[i])
 
         # ✅ If similarity above threshold, it's a match
-        if best_similarity >= threshold:
+        if sim >= threshold:
             matched_cases[best_match_id].append(pub_id)
-            print(f"[MATCH] {pub_id} ↔ {best_match_id} (Similarity: {best_similarity:.3f})")
-        else:
-            print(f"[NO MATCH] {pub_id} best similarity = {best_similarity:.3f}")
+            scores[(best_match_id, pub_id)] = sim
+            if verbose:
+                print(f"[MATCH] {pub_id} ↔ {best_match_id} (Similarity: {sim:.3f})")
+        elif verbose:
+            print(f"[NO MATCH] {pub_id} best similarity = {sim:.3f}")
 
-    return {"status": True, "result": matched_cases}
+    return {"status": True, "result": matched_cases, "scores": scores}
 
 
 if __name__ == "__main__":
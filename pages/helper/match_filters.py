@@ -0,0 +1,89 @@
+import os
+import threading
+from datetime import datetime, time as day_time
+
+import yaml
+
+# ✅ Candidate blocking rules applied before any embedding comparison.
+# A sighting is only compared with registered cases that pass every enabled
+# rule; a missing value (no region, no registration date, no age estimate)
+# never excludes a case. Rules live in match_filters.yml (see the example file).
+CONFIG_PATH = os.environ.get("SVR_MATCH_FILTERS", "match_filters.yml")
+
+DEFAULTS = {
+    "age_band": None,                     # years either side of the sighting's approximate age
+    "same_region": False,                 # only cases from the sighting's region
+    "registered_before_sighting": False,  # only cases registered by the sighting's date
+    "regions": {},                        # region name -> keywords found in addresses / locations
+}
+
+_rules = None
+_lock = threading.Lock()
+
+
+# -------------------- Loading --------------------
+def load_rules(path: str = CONFIG_PATH) -> dict:
+    rules = dict(DEFAULTS)
+    if os.path.isfile(path):
+        with open(path) as f:
+            overrides = yaml.safe_load(f) or {}
+        unknown = set(overrides) - set(DEFAULTS)
+        if unknown:
+            print(f"[WARN] Unknown match filter settings ignored: {sorted(unknown)}")
+        rules.update({k: v for k, v in overrides.items() if k in DEFAULTS})
+    rules["regions"] = {
+        name: [keyword.lower() for keyword in keywords or []]
+        for name, keywords in (rules["regions"] or {}).items()
+    }
+    return rules
+
+
+def get_rules() -> dict:
+    """Process-wide rules (loaded once)."""
+    global _rules
+    with _lock:
+        if _rules is None:
+            _rules = load_rules()
+        return _rules
+
+
+def enabled(rules: dict) -> bool:
+    return bool(rules["age_band"] or rules["same_region"] or rules["registered_before_sighting"])
+
+
+# -------------------- Regions --------------------
+def region_of(*texts, rules: dict = None):
+    """First configured region with a keyword in any of the texts, or None."""
+    rules = rules or get_rules()
+    text = " ".join(t for t in texts if t).lower()
+    if not text:
+        return None
+    for name, keywords in rules["regions"].items():
+        if any(keyword in text for keyword in keywords):
+            return name
+    return None
+
+
+# -------------------- Blocking --------------------
+def block_key(rules: dict, region, submitted_on, approx_age):
+    """
+    The part of a sighting's metadata the enabled rules look at. Sightings
+    with the same key share one candidate set, so it is queried once.
+    """
+    return (
+        region if rules["same_region"] else None,
+        submitted_on.date() if rules["registered_before_sighting"] and submitted_on else None,
+        approx_age if rules["age_band"] else None,
+    )
+
+
+def candidate_query(rules: dict, key) -> dict:
+    """Keyword arguments for db_queries.filtered_registered_case_ids for a block key."""
+    region, sighting_day, approx_age = key
+    band = rules["age_band"]
+    return {
+        "region": region,
+        # Whole sighting day, so a case registered later that day still qualifies
+        "registered_before": datetime.combine(sighting_day, day_time.max) if sighting_day else None,
+        "age_range": (approx_age - band, approx_age + band) if approx_age is not None else None,
+    }
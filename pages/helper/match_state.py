@@ -0,0 +1,76 @@
+import os
+import json
+import traceback
+from datetime import datetime
+
+# Persisted state for incremental matching: which NF cases were already scored
+# and the best registered match found so far for every NF sighting.
+STATE_PATH = "match_state.json"
+
+
+def last_run(path=STATE_PATH):
+    """When the last incremental pass (match_worker.py) finished, or None if it never ran."""
+    if not os.path.isfile(path):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+class MatchState:
+    def __init__(self, registered=None, public=None, best=None, generation=0):
+        self.registered = set(registered or [])
+        self.public = set(public or [])
+        # public_id -> [registered_id or None, similarity]
+        self.best = dict(best or {})
+        self.generation = generation
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        if not os.path.isfile(path):
+            return cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data["registered"], data["public"], data["best"], data["generation"])
+        except Exception:
+            # A corrupt state file only costs one full re-score
+            traceback.print_exc()
+            return cls()
+
+    def save(self, path=STATE_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "registered": sorted(self.registered),
+                    "public": sorted(self.public),
+                    "best": self.best,
+                    "generation": self.generation,
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    def diff(self, registered_now, public_now):
+        """
+        Compare with the current NF ID sets and drop stale entries.
+        Returns (new_registered, rescore_public): cases never scored, and
+        sightings that are new or whose best match was deleted/marked found.
+        """
+        registered_now, public_now = set(registered_now), set(public_now)
+        removed_registered = self.registered - registered_now
+
+        for pub_id in self.public - public_now:
+            self.best.pop(pub_id, None)
+
+        invalidated = {
+            pub_id
+            for pub_id, (reg_id, _) in self.best.items()
+            if reg_id is not None and reg_id in removed_registered
+        }
+        for pub_id in invalidated:
+            del self.best[pub_id]
+
+        new_registered = registered_now - self.registered
+        rescore_public = (public_now - self.public) | invalidated
+        self.registered, self.public = registered_now, public_now
+        return new_registered, rescore_public
@@ -0,0 +1,158 @@
+import os
+import time
+import queue
+import threading
+
+from pages.helper import inference_config
+
+# Process-wide registry of heavy inference models.
+# Models are created on first use (not at import time) and shared by every
+# page, script and worker thread in the process.
+
+FACE_MESH_POOL_SIZE = 4
+
+_models = {}
+_metrics = {}
+_lock = threading.Lock()
+
+
+def _rss_bytes():
+    """Current resident set size of this process, or None if unavailable."""
+    try:
+        import psutil
+
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_model(key, loader):
+    """
+    Return the model registered under `key`, calling `loader()` to build it
+    the first time. Concurrent first calls block until the single load is done.
+    """
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        if key not in _models:
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            _models[key] = loader()
+            rss_after = _rss_bytes()
+            _metrics[key] = {
+                "load_seconds": round(time.perf_counter() - start, 3),
+                "rss_delta_mb": (
+                    round((rss_after - rss_before) / 2**20, 1)
+                    if rss_before is not None and rss_after is not None
+                    else None
+                ),
+                "loaded_at": time.time(),
+            }
+            print(f"[MODEL] Loaded {key} in {_metrics[key]['load_seconds']}s")
+        return _models[key]
+
+
+def face_analysis_key(config=None):
+    # Thread settings are applied at load time but don't key the cache, so
+    # autotuning doesn't load a second copy of the model
+    config = config or inference_config.get_config()
+    return (
+        "insightface",
+        config["model_name"],
+        tuple(config["det_size"]),
+        tuple(config["providers"]),
+        tuple(config["modules"] or ()),
+    )
+
+
+def get_face_analysis(config=None):
+    """Shared InsightFace FaceAnalysis (detection + recognition) instance, see inference_config."""
+    config = config or inference_config.get_config()
+
+    def loader():
+        from insightface.app import FaceAnalysis
+
+        model = FaceAnalysis(
+            name=config["model_name"],
+            providers=list(config["providers"]),
+            allowed_modules=list(config["modules"] or ()) or None,
+        )
+        if config["autotune"] and inference_config.load_tuning(config) is None:
+            best, _ = inference_config.tune_face_analysis(model, config)
+            config.update(best)
+        inference_config.apply_session_options(model, config)
+        model.prepare(ctx_id=0, det_size=tuple(config["det_size"]))
+        return model
+
+    return get_model(face_analysis_key(config), loader)
+
+
+class FaceMeshPool:
+    """
+    Fixed-size pool of MediaPipe FaceMesh graphs. A graph is not safe to share
+    between threads, so each call checks one out; graphs are built on demand up
+    to `size` and reused for every later image.
+    """
+
+    def __init__(self, size=FACE_MESH_POOL_SIZE, **options):
+        self.size = size
+        self.options = options
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._idle.put(self._new_mesh())
+
+    def _new_mesh(self):
+        import mediapipe as mp
+
+        mesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, **self.options)
+        self._created += 1
+        return mesh
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                return self._new_mesh()
+        return self._idle.get()
+
+    def process(self, image):
+        """Run FaceMesh on an RGB image; returns the MediaPipe result."""
+        mesh = self._acquire()
+        try:
+            return mesh.process(image)
+        finally:
+            self._idle.put(mesh)
+
+
+def get_face_mesh_pool(size=FACE_MESH_POOL_SIZE, max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5):
+    """Shared pool of static-image FaceMesh graphs (478 landmarks with refine_landmarks)."""
+    options = {
+        "max_num_faces": max_num_faces,
+        "refine_landmarks": refine_landmarks,
+        "min_detection_confidence": min_detection_confidence,
+    }
+    key = ("mediapipe_face_mesh", size) + tuple(sorted(options.items()))
+    return get_model(key, lambda: FaceMeshPool(size, **options))
+
+
+def model_metrics():
+    """Load time and memory cost of every model loaded so far, keyed by a readable name."""
+    return {"/".join(str(part) for part in key): dict(stats) for key, stats in _metrics.items()}
+
+
+def clear():
+    """Drop every cached model (mainly for tests and config reloads)."""
+    with _lock:
+        _models.clear()
+        _metrics.clear()
@@ -0,0 +1,242 @@
+import os
+import re
+import tempfile
+
+import numpy as np
+import scipy.sparse
+
+from pages.helper import embedding_snapshot
+
+# Compact codes for the registered embedding snapshot, used for a cheap first
+# scoring pass whose best candidates are then re-ranked with the exact float32
+# rows (see match_algo.quantized_top_k). Methods and their size per 512-d face:
+#   float32   2 KB    the snapshot itself (exact baseline)
+#   float16   1 KB    half-precision copy
+#   int8      512 B   per-dimension symmetric scalar quantization
+#   pq<m>     m B     product quantization: m sub-vectors, 256 centroids each
+# Codes are stored next to the snapshot and rebuilt when its generation changes.
+#
+# This is a memory / recall trade-off, not a speedup. NumPy has no fast int8
+# kernel: an int32-accumulating integer matmul is ~40x slower than float32
+# BLAS, so float16/int8 codes are cast to float32 per block and scored with
+# BLAS. PQ lookup-table sums (a sparse product here, faster than a gather
+# loop) are 3-5x slower than a float32 scan. What shrinks is what the first
+# pass reads: the codes instead of the float32 snapshot, whose pages are
+# only touched for the re-ranked rows. quantization_report.py measures both.
+ENCODE_BLOCK = 65_536
+PQ_CENTROIDS = 256
+PQ_TRAIN_SAMPLE = 10_000
+
+
+def _kmeans(vectors, n_clusters, n_iter=10, seed=0):
+    """Plain (Euclidean) k-means; returns centroids of shape (n_clusters, dim)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        # argmin ||x - c||² = argmax (x·c - ||c||²/2)
+        assign = (vectors @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1)).argmax(axis=1)
+        counts = np.bincount(assign, minlength=n_clusters)
+        sums = np.stack(
+            [np.bincount(assign, weights=vectors[:, d], minlength=n_clusters) for d in range(vectors.shape[1])],
+            axis=1,
+        )
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+# -------------------- Quantizers --------------------
+class Float32Quantizer:
+    """No quantization: scores the float32 rows directly (exact baseline)."""
+
+    method = "float32"
+
+    def fit(self, matrix):
+        return self
+
+    def encode(self, matrix):
+        return np.asarray(matrix, dtype=np.float32)
+
+    def scores(self, queries, codes):
+        return queries @ codes.T
+
+    def state(self):
+        return {}
+
+    def load_state(self, state):
+        return self
+
+
+class Float16Quantizer:
+    method = "float16"
+
+    def fit(self, matrix):
+        return self
+
+    def encode(self, matrix):
+        return np.asarray(matrix, dtype=np.float16)
+
+    def scores(self, queries, codes):
+        return queries @ codes.astype(np.float32).T
+
+    def state(self):
+        return {}
+
+    def load_state(self, state):
+        return self
+
+
+class Int8Quantizer:
+    """x ≈ code * scale, with one scale per dimension (max |x| / 127)."""
+
+    method = "int8"
+
+    def __init__(self):
+        self.scale = None
+
+    def fit(self, matrix):
+        max_abs = np.abs(matrix).max(axis=0) if len(matrix) else np.ones(matrix.shape[1])
+        self.scale = (np.maximum(max_abs, 1e-12) / 127.0).astype(np.float32)
+        return self
+
+    def encode(self, matrix):
+        return np.clip(np.rint(matrix / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, queries, codes):
+        # q · (code * scale) = (q * scale) · code
+        return (queries * self.scale) @ codes.astype(np.float32).T
+
+    def state(self):
+        return {"scale": self.scale}
+
+    def load_state(self, state):
+        self.scale = state["scale"]
+        return self
+
+
+class ProductQuantizer:
+    """
+    Splits vectors into m sub-vectors and stores the index of the nearest of
+    256 centroids for each. Scores use per-query lookup tables (asymmetric
+    distance: the query itself is not quantized).
+    """
+
+    def __init__(self, m=32):
+        self.m = m
+        self.method = f"pq{m}"
+        self.codebooks = None   # (m, 256, dim / m)
+
+    def fit(self, matrix):
+        n, dim = matrix.shape
+        if dim % self.m:
+            raise ValueError(f"Embedding size {dim} is not divisible by m={self.m}")
+        rng = np.random.default_rng(0)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, min(n, PQ_TRAIN_SAMPLE), replace=False))], np.float32)
+        n_centroids = min(PQ_CENTROIDS, len(sample))
+        sub = dim // self.m
+        self.codebooks = np.stack(
+            [_kmeans(sample[:, j * sub:(j + 1) * sub], n_centroids) for j in range(self.m)]
+        ).astype(np.float32)
+        return self
+
+    def encode(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        sub = self.codebooks.shape[2]
+        codes = np.empty((len(matrix), self.m), dtype=np.uint8)
+        for j, codebook in enumerate(self.codebooks):
+            part = matrix[:, j * sub:(j + 1) * sub]
+            codes[:, j] = (part @ codebook.T - 0.5 * (codebook ** 2).sum(axis=1)).argmax(axis=1)
+        return codes
+
+    def scores(self, queries, codes):
+        n_centroids, sub = self.codebooks.shape[1:]
+        # lut[q, j * 256 + c] = query q's sub-vector j · centroid c of sub-space j
+        lut = np.einsum("qjd,jcd->qjc", queries.reshape(len(queries), self.m, sub), self.codebooks)
+        lut = lut.reshape(len(queries), -1)
+        # Each code row as a sparse one-hot over (sub-space, centroid): its score
+        # is the sum of its m table entries, computed as one sparse product
+        columns = (codes.astype(np.int64) + np.arange(self.m) * n_centroids).ravel()
+        one_hot = scipy.sparse.csr_matrix(
+            (np.ones(len(columns), dtype=np.float32), columns, np.arange(0, len(columns) + 1, self.m)),
+            shape=(len(codes), lut.shape[1]),
+        )
+        return np.asarray((one_hot @ lut.T).T, dtype=np.float32)
+
+    def state(self):
+        return {"codebooks": self.codebooks}
+
+    def load_state(self, state):
+        self.codebooks = state["codebooks"]
+        return self
+
+
+def make_quantizer(method):
+    if method == "float32":
+        return Float32Quantizer()
+    if method == "float16":
+        return Float16Quantizer()
+    if method == "int8":
+        return Int8Quantizer()
+    pq = re.fullmatch(r"pq(\d+)", method or "")
+    if pq:
+        return ProductQuantizer(int(pq.group(1)))
+    raise ValueError(f"Unknown quantization method: {method}")
+
+
+def encode_matrix(quantizer, matrix):
+    """Encode a (possibly memory-mapped) matrix block by block."""
+    blocks = [quantizer.encode(matrix[start:start + ENCODE_BLOCK]) for start in range(0, len(matrix), ENCODE_BLOCK)]
+    return np.concatenate(blocks) if blocks else quantizer.encode(np.empty((0, matrix.shape[1]), np.float32))
+
+
+def bytes_per_vector(codes):
+    return codes.itemsize * (codes.shape[1] if codes.ndim > 1 else 1)
+
+
+# -------------------- Persisted Codes --------------------
+def codes_path(kind, method):
+    return os.path.join(embedding_snapshot.SNAPSHOT_DIR, f"{kind}_{method}.npz")
+
+
+def load_codes(snapshot, method):
+    """
+    (quantizer, codes) for a snapshot, read from disk when they match its
+    generation and re-encoded otherwise. Trained PQ codebooks are reused
+    until the data has doubled since they were trained.
+    """
+    quantizer = make_quantizer(method)
+    if method == "float32":
+        return quantizer, snapshot.matrix
+    path = codes_path(snapshot.kind, method)
+    state = None
+    if os.path.isfile(path):
+        try:
+            data = np.load(path, allow_pickle=False)
+            state = {key: data[key] for key in data.files}
+        except Exception as e:
+            print(f"[WARN] Could not read {path}: {e}")
+
+    if state is not None and int(state["generation"]) == snapshot.generation:
+        return quantizer.load_state(state), state["codes"]
+
+    trained_size = int(state["trained_size"]) if state is not None else 0
+    if state is not None and len(snapshot) <= 2 * trained_size:
+        quantizer.load_state(state)
+    else:
+        quantizer.fit(snapshot.matrix)
+        trained_size = len(snapshot)
+    codes = encode_matrix(quantizer, snapshot.matrix)
+
+    os.makedirs(embedding_snapshot.SNAPSHOT_DIR, exist_ok=True)
+    # A unique temp file, so two processes re-encoding at once never share one
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        np.savez(
+            f,
+            codes=codes,
+            generation=np.array(snapshot.generation),
+            trained_size=np.array(trained_size),
+            **quantizer.state(),
+        )
+    os.replace(tmp_path, path)
+    return quantizer, codes
@@ -1,6 +1,9 @@
+import uuid
 import streamlit as st
 from functools import wraps
 
+from pages.helper import image_store, upload_cache
+
 
 def require_login(func):
     """Decorator to require login for Streamlit pages."""
@@ -28,3 +31,49 @@ def show_error(message: str):
 
 def show_warning(message: str):
     st.warning(message)
+
+
+def upload_identity(upload) -> str:
+    """Identifies one uploaded file across reruns (a re-upload gets a new identity)."""
+    return getattr(upload, "file_id", None) or f"{upload.name}:{upload.size}"
+
+
+def process_upload_once(key: str, upload, compute, pipeline: str = "default"):
+    """
+    Run upload_cache.process_upload at most once per uploaded file in this session.
+
+    Streamlit reruns the page on every widget change; the result (and the case
+    ID the photo was stored under) is kept in session state under `key`. When
+    the upload is replaced or cleared before mark_upload_saved(), its files are
+    deleted. `pipeline` names the extractor behind `compute` (see
+    upload_cache.content_hash). Returns (case_id, processed), or (None, None) without an upload.
+    """
+    state = st.session_state.get(key)
+    if state and (upload is None or state["upload_id"] != upload_identity(upload)):
+        if not state["saved"]:
+            image_store.delete_images(state["case_id"])
+        del st.session_state[key]
+        state = None
+
+    if upload is None:
+        return None, None
+    if state is None:
+        case_id = str(uuid.uuid4())
+        state = {
+            "upload_id": upload_identity(upload),
+            "case_id": case_id,
+            "processed": upload_cache.process_upload(case_id, upload, compute, pipeline),
+            "saved": False,
+        }
+        st.session_state[key] = state
+    return state["case_id"], state["processed"]
+
+
+def upload_saved(key: str) -> bool:
+    return bool(st.session_state.get(key, {}).get("saved"))
+
+
+def mark_upload_saved(key: str):
+    """Keep the stored photo: its case has been written to the database."""
+    if key in st.session_state:
+        st.session_state[key]["saved"] = True
@@ -0,0 +1,133 @@
+import hashlib
+import traceback
+
+import numpy as np
+import PIL.Image
+
+from pages.helper import db_queries, image_store
+from pages.helper.data_models import RegisteredCases, PublicSubmissions, UploadCache
+from pages.helper.embedding_codec import encode_embedding, decode_embedding, encode_landmarks, decode_landmarks
+
+# Content-addressed cache of processed uploads, persisted in the `uploadcache`
+# table. The same photo uploaded again (by anyone) skips face detection,
+# embedding and face mesh, reuses the stored image files and is flagged as a
+# likely duplicate submission.
+MAX_ENTRIES = 20_000
+DUPLICATE_DISTANCE = 6   # max differing dHash bits for "looks like the same photo"
+# Bump when an extractor changes its output so older cache entries are not reused
+PIPELINE_VERSION = 2
+
+
+# -------------------- Hashing --------------------
+def content_hash(image_np: np.ndarray, pipeline: str = "default") -> str:
+    """
+    SHA-256 of the decoded pixels (so re-saved files with equal pixels match),
+    keyed by the `pipeline` that computed the face data: the same photo run
+    through a different extractor gets its own entry.
+    """
+    digest = hashlib.sha256(f"{pipeline}:v{PIPELINE_VERSION}:{image_np.shape}".encode("utf-8"))
+    digest.update(np.ascontiguousarray(image_np).tobytes())
+    return digest.hexdigest()
+
+
+def dhash(image_np: np.ndarray) -> int:
+    """64-bit difference hash; robust to re-compression and resizing."""
+    gray = PIL.Image.fromarray(image_np).convert("L").resize((9, 8), PIL.Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = np.packbits((pixels[:, 1:] > pixels[:, :-1]).ravel())
+    # Stored as a signed 64-bit integer (SQLite INTEGER)
+    return int(bits.view(">i8")[0])
+
+
+def hamming(a: np.ndarray, b: int) -> np.ndarray:
+    xor = (a ^ np.int64(b)).view(np.uint8)
+    return np.unpackbits(xor).reshape(len(a), 64).sum(axis=1)
+
+
+# -------------------- Duplicates --------------------
+def find_duplicates(image_hash: int, exclude: str = None):
+    """
+    Return [(case_id, "registered"|"public")] of stored cases whose photo looks
+    the same as `image_hash`. Cache entries for photos that were never submitted
+    (or whose case was deleted) are ignored.
+    """
+    rows = db_queries.fetch_upload_dhashes()
+    if not rows:
+        return []
+    hashes = np.array([r[0] for r in rows], dtype=np.int64)
+    close = np.flatnonzero(hamming(hashes, image_hash) <= DUPLICATE_DISTANCE)
+    case_ids = {rows[i][1] for i in close} - {exclude}
+    if not case_ids:
+        return []
+    registered = db_queries.existing_case_ids(RegisteredCases, case_ids)
+    public = db_queries.existing_case_ids(PublicSubmissions, case_ids)
+    return [(c, "registered") for c in sorted(registered)] + [(c, "public") for c in sorted(public)]
+
+
+# -------------------- Processing --------------------
+def process_upload(case_id: str, upload, compute, pipeline: str = "default"):
+    """
+    Decode an upload, store its image for `case_id` and return the face data.
+
+    `compute(image_np) -> (embedding, face_mesh)` only runs when these exact
+    pixels have not been processed by the same `pipeline` before. Returns a dict with the normalized
+    RGB `image`, `embedding`, `face_mesh`, `cached`, `duplicates` and the
+    `content_hash` to pass to record_case() once the case is saved.
+    """
+    image = image_store.load_upload(upload)
+    image_np = np.array(image)
+    key = content_hash(image_np, pipeline)
+    image_dhash = dhash(image_np)
+
+    entry = None
+    try:
+        entry = db_queries.get_cached_upload(key)
+    except Exception:
+        traceback.print_exc()
+
+    if entry is not None:
+        embedding = decode_embedding(entry.embedding)
+        face_mesh = decode_landmarks(entry.face_mesh)
+        if not image_store.link_images(entry.case_id, case_id):
+            image_store.save_image(case_id, image)
+    else:
+        embedding, face_mesh = compute(image_np)
+        image_store.save_image(case_id, image)
+        # Only successful runs are cached so a retry can still find the face
+        if embedding is not None:
+            try:
+                db_queries.save_cached_upload(
+                    UploadCache(
+                        content_hash=key,
+                        dhash=image_dhash,
+                        case_id=case_id,
+                        embedding=encode_embedding(embedding),
+                        face_mesh=encode_landmarks(face_mesh),
+                    ),
+                    MAX_ENTRIES,
+                )
+            except Exception:
+                traceback.print_exc()
+
+    try:
+        duplicates = find_duplicates(image_dhash, exclude=case_id)
+    except Exception:
+        traceback.print_exc()
+        duplicates = []
+
+    return {
+        "image": image_np,
+        "embedding": embedding,
+        "face_mesh": face_mesh,
+        "cached": entry is not None,
+        "duplicates": duplicates,
+        "content_hash": key,
+    }
+
+
+def record_case(content_hash: str, case_id: str):
+    """Call after saving a case so later uploads of the photo are flagged against it."""
+    try:
+        db_queries.set_cached_upload_case(content_hash, case_id)
+    except Exception:
+        traceback.print_exc()
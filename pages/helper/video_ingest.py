@@ -0,0 +1,221 @@
+import uuid
+import time
+import hashlib
+
+import cv2
+import numpy as np
+import PIL.Image
+
+from pages.helper import db_queries, image_store
+from pages.helper.data_models import PublicSubmissions
+from pages.helper.embedding_codec import encode_embedding
+from pages.helper.face_recognition_model import extract_faces, crop_face
+
+# Streaming pipeline for video clips / CCTV footage:
+#   iter_frames -> sample_frames -> detect_faces -> track_faces -> sightings
+# Every stage is a generator, so only the current batch of frames and the open
+# face tracks are held in memory, whatever the length of the file.
+
+SAMPLE_EVERY = 0.25        # seconds between decoded frames
+MIN_FRAME_CHANGE = 4.0     # mean abs grey-level change (0–255) to keep a frame
+MAX_SKIP = 2.0             # keep a frame at least this often even if the scene is static
+DETECT_BATCH = 8           # frames per extract_faces call
+MIN_DET_SCORE = 0.6
+TRACK_SIMILARITY = 0.45    # cosine similarity to continue an existing track
+TRACK_TIMEOUT = 3.0        # seconds without a detection before a track closes (> MAX_SKIP)
+MIN_TRACK_FACES = 2        # shorter tracks are treated as false detections
+KEEP_FACES = 5             # best faces kept per track for representatives
+ID_NAMESPACE = uuid.UUID("0d6c5d5e-8f0b-4e55-a1f6-2a7fb0a6e4c3")
+HASH_CHUNK = 1 << 20
+
+
+# -------------------- Frames --------------------
+def iter_frames(path, sample_every: float = SAMPLE_EVERY):
+    """Yield (timestamp, rgb_frame) every `sample_every` seconds, decoding only those frames."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(int(round(fps * sample_every)), 1)
+        index = 0
+        # grab() advances without decoding; retrieve() decodes only sampled frames
+        while capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    yield index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        capture.release()
+
+
+def sample_frames(frames, min_change: float = MIN_FRAME_CHANGE, max_skip: float = MAX_SKIP):
+    """Drop near-duplicate frames (static camera, no movement), keeping one every max_skip seconds."""
+    last_thumb, last_time = None, None
+    for timestamp, frame in frames:
+        thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), (64, 36), interpolation=cv2.INTER_AREA)
+        thumb = thumb.astype(np.int16)
+        if (
+            last_thumb is None
+            or timestamp - last_time >= max_skip
+            or np.abs(thumb - last_thumb).mean() >= min_change
+        ):
+            last_thumb, last_time = thumb, timestamp
+            yield timestamp, frame
+
+
+def detect_faces(frames, batch_size: int = DETECT_BATCH, min_score: float = MIN_DET_SCORE):
+    """Yield (timestamp, frame, faces) with faces detected and embedded a batch of frames at a time."""
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield from _detect_batch(batch, min_score)
+            batch = []
+    if batch:
+        yield from _detect_batch(batch, min_score)
+
+
+def _detect_batch(batch, min_score):
+    results = extract_faces([frame for _, frame in batch], min_score=min_score)
+    for (timestamp, frame), faces in zip(batch, results):
+        yield timestamp, frame, faces
+
+
+# -------------------- Tracking --------------------
+class FaceTrack:
+    """One person across consecutive frames: running mean embedding plus the best face crops."""
+
+    def __init__(self, number, timestamp, face, crop):
+        self.number = number      # order of appearance in the video
+        self.start = timestamp
+        self.last_seen = timestamp
+        self.count = 0
+        self.embedding_sum = np.zeros_like(face["embedding"])
+        self.best = []   # (quality, timestamp, crop, embedding), at most KEEP_FACES
+        self.add(timestamp, face, crop)
+
+    @property
+    def embedding(self):
+        return self.embedding_sum / np.linalg.norm(self.embedding_sum)
+
+    def add(self, timestamp, face, crop):
+        self.last_seen = timestamp
+        self.count += 1
+        self.embedding_sum += face["embedding"]
+        x1, y1, x2, y2 = face["bbox"]
+        quality = face["det_score"] * (x2 - x1) * (y2 - y1)
+        self.best.append((quality, timestamp, crop, face["embedding"]))
+        self.best.sort(key=lambda item: item[0], reverse=True)
+        del self.best[KEEP_FACES:]
+
+    def representatives(self, count: int = 1):
+        """
+        Up to `count` (embedding, crop) pairs: the track's mean embedding with its
+        best crop first, then the kept faces that differ most from those chosen.
+        """
+        chosen = [(self.embedding, self.best[0][2])]
+        remaining = list(self.best[1:])
+        while len(chosen) < count and remaining:
+            chosen_matrix = np.stack([embedding for embedding, _ in chosen])
+            # farthest-point selection: most different face from everything chosen
+            spread = [np.max(chosen_matrix @ item[3]) for item in remaining]
+            _, _, crop, embedding = remaining.pop(int(np.argmin(spread)))
+            chosen.append((embedding, crop))
+        return chosen
+
+
+def track_faces(detections, similarity: float = TRACK_SIMILARITY, timeout: float = TRACK_TIMEOUT):
+    """Greedily link faces to open tracks by embedding similarity; yield each track once it closes."""
+    tracks = []
+    created = 0
+    for timestamp, frame, faces in detections:
+        closed = [t for t in tracks if timestamp - t.last_seen > timeout]
+        tracks = [t for t in tracks if timestamp - t.last_seen <= timeout]
+        yield from closed
+
+        available = list(tracks)
+        for face in faces:
+            # copy: a view would keep the whole frame alive inside the track
+            crop = crop_face(frame, face["bbox"]).copy()
+            if available:
+                scores = np.stack([t.embedding for t in available]) @ face["embedding"]
+                best = int(np.argmax(scores))
+                if scores[best] >= similarity:
+                    # one face per track per frame
+                    available.pop(best).add(timestamp, face, crop)
+                    continue
+            tracks.append(FaceTrack(created, timestamp, face, crop))
+            created += 1
+    yield from tracks
+
+
+# -------------------- Ingestion --------------------
+def file_digest(path):
+    """SHA-256 of the file contents: identifies a clip whatever its name or folder."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def video_sightings(path, representatives: int = 1, min_track_faces: int = MIN_TRACK_FACES,
+                    sample_every: float = SAMPLE_EVERY):
+    """Yield (track, rank, embedding, crop) for the representative faces of every kept track."""
+    frames = sample_frames(iter_frames(path, sample_every))
+    for track in track_faces(detect_faces(frames)):
+        if track.count < min_track_faces:
+            continue
+        for rank, (embedding, crop) in enumerate(track.representatives(representatives)):
+            yield track, rank, embedding, crop
+
+
+def ingest_video(path, submitted_by="public_user", location=None, mobile=None,
+                 representatives: int = 1, sample_every: float = SAMPLE_EVERY, chunk_size: int = 32):
+    """
+    Store one PublicSubmissions row (plus its face crop) per representative
+    face of each track in the video. IDs are derived from the file's contents
+    and the track number, so re-running the same clip does not duplicate
+    sightings, while two different clips with the same name never collide.
+    """
+    db_queries.create_db()
+    start = time.perf_counter()
+    source = file_digest(path)
+    inserted, tracks, pending = 0, set(), []
+
+    def flush(items):
+        done = db_queries.existing_case_ids(PublicSubmissions, [row.id for row, _ in items])
+        new_items = [(row, crop) for row, crop in items if row.id not in done]
+        # Crops are written only for rows that are actually inserted, so a
+        # re-run never overwrites the photo of an existing sighting
+        for row, crop in new_items:
+            image_store.save_image(row.id, PIL.Image.fromarray(crop))
+        db_queries.bulk_new_public_cases([row for row, _ in new_items])
+        return len(new_items)
+
+    for track, rank, embedding, crop in video_sightings(path, representatives, sample_every=sample_every):
+        tracks.add(track.number)
+        case_id = str(uuid.uuid5(ID_NAMESPACE, f"{source}#{track.number}.{rank}"))
+        row = PublicSubmissions(
+            id=case_id,
+            submitted_by=submitted_by,
+            location=location,
+            mobile=mobile,
+            embedding=encode_embedding(embedding),
+            status="NF",
+        )
+        pending.append((row, crop))
+        if len(pending) >= chunk_size:
+            inserted += flush(pending)
+            pending = []
+    if pending:
+        inserted += flush(pending)
+
+    return {
+        "status": True,
+        "tracks": len(tracks),
+        "sightings": inserted,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
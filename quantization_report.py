@@ -0,0 +1,123 @@
+"""
+Recall vs. memory (and speed) of quantized matching on this deployment's own embeddings.
+
+Every method scores the NF registered-case snapshot in a first pass and
+re-ranks the top candidates with the exact float32 vectors; results are
+compared with exact (float32) search for the same queries:
+
+    recall@1   share of queries whose best match is the exact best match
+    recall@k   share of the exact top-k found in the returned top-k
+    decisions  share of queries with the same match / no-match outcome at --threshold
+
+Quantization here is a recall / memory trade-off with no speedup: the codes
+are scored with float32 BLAS after a cast (int8, float16) or through lookup
+tables (pq), so expect a speedup below 1.0 (see pages/helper/quantization.py).
+B/vec is the memory the first pass reads per registered case.
+
+Queries are the NF sightings. With --query-source registered (e.g. when there
+are few sightings yet) a sample of registered cases plus small noise is used,
+so each query has a known true match, like a re-sighting of that person.
+
+    python quantization_report.py [--methods float16 int8 pq64 pq32] [--rerank 1 10 50] [--k 10]
+    python quantization_report.py --query-source registered --queries 2000 --out quant.json
+"""
+import json
+import time
+import argparse
+
+import numpy as np
+
+from pages.helper import db_queries, embedding_snapshot, match_algo, quantization
+
+DEFAULT_METHODS = ["float16", "int8", "pq64", "pq32"]
+QUERY_NOISE = 0.03
+
+
+def load_queries(source, count, seed):
+    if source == "public":
+        queries = np.asarray(embedding_snapshot.load("public").matrix)
+    else:
+        registered = embedding_snapshot.load("registered", refresh=False)
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(registered), min(count, len(registered)), replace=False))
+        queries = registered.matrix[rows] + QUERY_NOISE * rng.standard_normal((len(rows), registered.matrix.shape[1]))
+        queries = match_algo.stack_embeddings(queries)
+    if count and len(queries) > count:
+        queries = queries[np.random.default_rng(seed).choice(len(queries), count, replace=False)]
+    return np.ascontiguousarray(queries, dtype=np.float32)
+
+
+def timed_search(quantizer, codes, matrix, queries, k, rerank):
+    start = time.perf_counter()
+    idx, sims = match_algo.quantized_top_k(quantizer, codes, matrix, queries, k=k, rerank=rerank)
+    return idx, sims, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized matching: recall vs. memory report")
+    parser.add_argument("--methods", nargs="+", default=DEFAULT_METHODS, help="float16, int8, pq<m> (m divides 512)")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 10, 50], help="Candidates re-scored exactly")
+    parser.add_argument("--k", type=int, default=10, help="Depth for recall@k")
+    parser.add_argument("--query-source", choices=["public", "registered"], default="public")
+    parser.add_argument("--queries", type=int, default=2000, help="Max queries (sampled)")
+    parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the rows as JSON")
+    args = parser.parse_args()
+
+    db_queries.create_db()
+    registered = embedding_snapshot.load("registered")
+    queries = load_queries(args.query_source, args.queries, args.seed)
+    if not len(registered) or not len(queries):
+        print("No data available (try --query-source registered)")
+        return
+    k = min(args.k, len(registered))
+    print(f"{len(registered)} registered cases, {len(queries)} {args.query_source} queries, k={k}")
+
+    exact_quantizer, exact_codes = quantization.load_codes(registered, "float32")
+    exact_idx, exact_sims, exact_seconds = timed_search(
+        exact_quantizer, exact_codes, registered.matrix, queries, k, k
+    )
+    exact_match = exact_sims[:, 0] >= args.threshold
+
+    rows = [{
+        "method": "float32", "rerank": 0, "bytes_per_vector": quantization.bytes_per_vector(exact_codes),
+        "recall@1": 1.0, f"recall@{k}": 1.0, "decisions": 1.0,
+        "seconds": round(exact_seconds, 4), "speedup": 1.0, "build_seconds": 0.0,
+    }]
+    for method in args.methods:
+        start = time.perf_counter()
+        quantizer, codes = quantization.load_codes(registered, method)
+        build_seconds = time.perf_counter() - start
+        for rerank in args.rerank:
+            # With fewer re-ranked candidates than k only recall@1 is meaningful
+            depth = min(k, rerank)
+            idx, sims, seconds = timed_search(quantizer, codes, registered.matrix, queries, depth, rerank)
+            found = np.mean([len(set(a) & set(b)) / k for a, b in zip(idx, exact_idx)]) if depth == k else None
+            rows.append({
+                "method": method,
+                "rerank": rerank,
+                "bytes_per_vector": quantization.bytes_per_vector(codes),
+                "recall@1": round(float(np.mean(idx[:, 0] == exact_idx[:, 0])), 4),
+                f"recall@{k}": round(float(found), 4) if found is not None else None,
+                "decisions": round(float(np.mean((sims[:, 0] >= args.threshold) == exact_match)), 4),
+                "seconds": round(seconds, 4),
+                "speedup": round(exact_seconds / seconds, 2) if seconds else None,
+                "build_seconds": round(build_seconds, 2),
+            })
+
+    print(f"\n{'method':<8} {'rerank':>6} {'B/vec':>6} {'R@1':>7} {f'R@{k}':>7} {'decide':>7} {'sec':>8} {'speedup':>8}")
+    for row in rows:
+        recall_k = row[f"recall@{k}"]
+        recall_k = f"{recall_k:.4f}" if recall_k is not None else "-"
+        print(f"{row['method']:<8} {row['rerank']:>6} {row['bytes_per_vector']:>6} {row['recall@1']:>7.4f} "
+              f"{recall_k:>7} {row['decisions']:>7.4f} "
+              f"{row['seconds']:>8.3f} {row['speedup']:>8}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n✅ Wrote {len(rows)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
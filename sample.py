@@ -1,7 +1,7 @@
 from pages.helper.data_models import RegisteredCases, PublicSubmissions
-from sqlmodel import create_engine
+from pages.helper.database import get_engine
 
-engine = create_engine("sqlite:///sqlite_database.db")
+engine = get_engine()
 RegisteredCases.__table__.create(engine, checkfirst=True)
 PublicSubmissions.__table__.create(engine, checkfirst=True)
 print("✅ Tables recreated successfully.")
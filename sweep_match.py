@@ -0,0 +1,48 @@
+"""
+Full exact matching sweep across processes.
+
+Scores every NF sighting against every NF registered case, with the registered
+embeddings split into shards that worker processes score from the memory-mapped
+embedding snapshot, and writes the best matches to the `matches` table.
+Meant for large backlogs (e.g. a state-wide sweep); day-to-day updates are
+handled incrementally by match_worker.py.
+
+    python sweep_match.py [--processes 8] [--shards 32] [--threshold 0.35] [--dry-run]
+    python sweep_match.py --filters    # apply the match_filters.yml blocking rules instead
+"""
+import os
+import time
+import argparse
+
+from pages.helper import db_queries, match_algo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded full matching sweep")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Registered-case shards (default: one per process)")
+    parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--filters", action="store_true",
+                        help="Only compare sightings with cases passing the match_filters.yml rules")
+    parser.add_argument("--dry-run", action="store_true", help="Report matches without writing them")
+    args = parser.parse_args()
+
+    db_queries.create_db()
+    start = time.perf_counter()
+    if args.filters:
+        result = match_algo.match_filtered(args.threshold)
+    else:
+        result = match_algo.match_sharded(args.threshold, shards=args.shards, workers=args.processes)
+    if not result["status"]:
+        print(f"[SWEEP] {result['message']}")
+        return
+    if not args.dry_run:
+        db_queries.replace_matches(result["scores"])
+    mode = "filtered" if args.filters else f"{args.processes} processes"
+    print(f"✅ {len(result['scores'])} matches in {time.perf_counter() - start:.2f}s "
+          f"({mode}{', not written' if args.dry_run else ''})")
+
+
+if __name__ == "__main__":
+    main()
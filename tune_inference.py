@@ -0,0 +1,38 @@
+"""
+Benchmark ONNX Runtime thread layouts for the face models on this host.
+
+Loads the configured InsightFace models, times detection + recognition under
+each candidate layout (inference_config.candidate_settings) and records the
+fastest in inference_tuning.json. The app uses it when `autotune: true` is set
+in inference_config.yml (or SVR_INFER_AUTOTUNE=1); with autotune on and no
+recorded result, the same benchmark runs once at first model load.
+
+    python tune_inference.py [--runs 10]
+"""
+import os
+import argparse
+
+from pages.helper import inference_config, model_cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the fastest ONNX Runtime settings for this host")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per model and setting")
+    args = parser.parse_args()
+
+    config = inference_config.get_config()
+    app = model_cache.get_face_analysis(config)
+    print(f"Host: {os.cpu_count()} CPUs, providers {config['providers']}, det_size {config['det_size']}")
+    best, results = inference_config.tune_face_analysis(app, config, runs=args.runs)
+
+    print(f"\n{'intra':>6} {'inter':>6} {'mode':<11} {'ms/image':>9}")
+    for row in sorted(results, key=lambda r: r["seconds"]):
+        print(f"{row['intra_op_threads']:>6} {row['inter_op_threads']:>6} {row['execution_mode']:<11} "
+              f"{row['seconds'] * 1000:>9.1f}")
+    print(f"\n✅ Saved {best} to {inference_config.TUNING_PATH}")
+    if not config["autotune"]:
+        print("Set `autotune: true` in inference_config.yml to use it.")
+
+
+if __name__ == "__main__":
+    main()